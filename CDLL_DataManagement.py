@@ -3,44 +3,243 @@ Project 5: Deque
 Shams Alkhalidy
 """
 
-import gc
-from typing import TypeVar, List
-from random import randint, shuffle
-from timeit import default_timer
-# COMMENT OUT THIS LINE (and `plot_speed`) if you don't want matplotlib
-from matplotlib import pyplot as plt
+from array import array, typecodes as array_typecodes
+from contextlib import nullcontext
+from functools import wraps
+from itertools import islice
+from mmap import mmap
+from os import path as os_path
+from queue import Empty, Full
+from struct import Struct
+from sys import getsizeof
+from threading import Condition, Lock
+from time import monotonic, perf_counter, sleep
+from typing import TypeVar, List, Iterable, Iterator, Tuple, Callable
 
 T = TypeVar('T')
 CDLLNode = type('CDLLNode')
 
+
+class ResizePolicy:
+    """
+    Growth and shrink rules used by a CircularDeque when it resizes
+    The defaults reproduce the classic behaviour: double when full,
+    halve once the deque is at most 1/4 full, never go below a capacity of 4
+    """
+
+    __slots__ = ['growth_factor', 'shrink_factor', 'shrink_at', 'min_capacity']
+
+    def __init__(self, growth_factor: float = 2, shrink_factor: float = 2,
+                 shrink_at: float = 1/4, min_capacity: int = 4) -> None:
+        """
+        Creates a resize policy
+        :param growth_factor: capacity is multiplied by this when the deque fills up
+        :param shrink_factor: capacity is divided by this when the deque shrinks
+        :param shrink_at: shrink once size <= shrink_at * capacity. Lower values add more hysteresis
+            between growing and shrinking, so a deque oscillating around a boundary stops thrashing
+        :param min_capacity: the capacity never shrinks below this
+        :return: None
+        """
+        if growth_factor <= 1 or shrink_factor <= 1:
+            raise ValueError("growth_factor and shrink_factor must be greater than 1")
+        if not 0 <= shrink_at * shrink_factor < 1:
+            raise ValueError("shrink_at * shrink_factor must be in [0, 1) or a shrunk deque would be full")
+        if min_capacity < 1:
+            raise ValueError("min_capacity must be at least 1")
+        self.growth_factor = growth_factor
+        self.shrink_factor = shrink_factor
+        self.shrink_at = shrink_at
+        self.min_capacity = min_capacity
+
+    def __repr__(self) -> str:
+        """
+        :return: a string representation of the ResizePolicy
+        """
+        return (f"ResizePolicy(growth_factor={self.growth_factor}, shrink_factor={self.shrink_factor}, "
+                f"shrink_at={self.shrink_at}, min_capacity={self.min_capacity})")
+
+    def __reduce__(self) -> tuple:
+        """
+        Pickles the policy as its constructor arguments, so it works with every pickle protocol
+        :return: the callable and arguments that recreate the ResizePolicy
+        """
+        return ResizePolicy, (self.growth_factor, self.shrink_factor, self.shrink_at, self.min_capacity)
+
+    def grown(self, capacity: int, size: int) -> int:
+        """
+        Applies the growth factor as many times as needed to hold `size` elements without being full
+        param capacity: the current capacity
+        param size: the number of elements that must fit
+        Returns: the new capacity, always greater than size
+        """
+        while capacity <= size:
+            capacity = max(int(capacity * self.growth_factor), capacity + 1)
+        return capacity
+
+    def shrunk(self, capacity: int, size: int) -> int:
+        """
+        Applies the shrink factor once, never going below min_capacity or filling the deque
+        param capacity: the current capacity
+        param size: the number of elements that must still fit
+        Returns: the new capacity
+        """
+        return max(int(capacity / self.shrink_factor), self.min_capacity, size + 1)
+
+    def shrink_size(self, capacity: int) -> int:
+        """
+        Computes the size at or below which a deque of the given capacity should shrink
+        param capacity: the current capacity
+        Returns: the shrink threshold, -1 if a deque of this capacity must never shrink
+        """
+        if capacity / self.shrink_factor < self.min_capacity:
+            return -1
+        # never report a threshold at which shrinking could not actually reduce the capacity
+        return min(int(self.shrink_at * capacity), capacity - 2)
+
+
+DEFAULT_POLICY = ResizePolicy()
+
+
+class DequeStats:
+    """
+    Opt-in instrumentation counters for a deque: operations per end, resizes, elements copied
+    and time spent resizing, and the peak size and capacity.
+    Attach one through a deque's `stats` argument or attribute; a deque without one only pays
+    for a single `is not None` check per operation
+    """
+
+    __slots__ = ['front_enqueues', 'back_enqueues', 'front_dequeues', 'back_dequeues',
+                 'resizes', 'copied', 'resize_seconds', 'peak_size', 'peak_capacity', 'on_resize']
+
+    def __init__(self, on_resize: Callable[[int, int, int, float], None] = None) -> None:
+        """
+        Creates a set of zeroed counters
+        :param on_resize: called after every resize with (old capacity, new capacity, elements copied, seconds taken)
+        :return: None
+        """
+        self.on_resize: Callable[[int, int, int, float], None] = on_resize
+        self.reset()
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the counters
+        """
+        return "DequeStats(" + ", ".join(f"{key}={value}" for key, value in self.as_dict().items()) + ")"
+
+    __repr__ = __str__
+
+    def __reduce__(self) -> tuple:
+        """
+        Pickles the stats as their constructor argument plus the counters, so they work with every pickle protocol
+        :return: the callable, arguments and slot state that recreate the DequeStats
+        """
+        return DequeStats, (self.on_resize,), (None, self.as_dict())
+
+    def reset(self) -> None:
+        """
+        Zeroes every counter
+        """
+        self.front_enqueues = self.back_enqueues = 0
+        self.front_dequeues = self.back_dequeues = 0
+        self.resizes = self.copied = 0
+        self.resize_seconds = 0.0
+        self.peak_size = self.peak_capacity = 0
+
+    def as_dict(self) -> dict:
+        """
+        :return: the counters as a dict
+        """
+        return {key: getattr(self, key) for key in self.__slots__ if key != 'on_resize'}
+
+    def enqueued(self, front: bool, count: int, size: int) -> None:
+        """
+        Records `count` values enqueued at one end, leaving the deque with `size` values
+        """
+        if front:
+            self.front_enqueues += count
+        else:
+            self.back_enqueues += count
+        if size > self.peak_size:
+            self.peak_size = size
+
+    def dequeued(self, front: bool, count: int) -> None:
+        """
+        Records `count` values dequeued from one end
+        """
+        if front:
+            self.front_dequeues += count
+        else:
+            self.back_dequeues += count
+
+    def seen_capacity(self, capacity: int) -> None:
+        """
+        Records a capacity the deque has had, e.g. its starting one, for peak_capacity
+        """
+        if capacity > self.peak_capacity:
+            self.peak_capacity = capacity
+
+    def resized(self, old_capacity: int, capacity: int, copied: int, seconds: float) -> None:
+        """
+        Records a resize from `old_capacity` to `capacity` that copied `copied` elements in `seconds`
+        """
+        self.resizes += 1
+        self.copied += copied
+        self.resize_seconds += seconds
+        self.seen_capacity(max(old_capacity, capacity))
+        if self.on_resize is not None:
+            self.on_resize(old_capacity, capacity, copied, seconds)
+
+
 class CircularDeque:
     """
     Representation of a Circular Deque using an underlying python list
     """
 
-    __slots__ = ['capacity', 'size', 'queue', 'front', 'back']
+    __slots__ = ['capacity', 'size', 'queue', 'front', 'back', 'policy', 'shrink_size',
+                 'maxlen', 'on_evict', 'evicted', 'stats']
 
-    def __init__(self, data: List[T] = None, front: int = 0, capacity: int = 4):
+    def __init__(self, data: List[T] = None, front: int = 0, capacity: int = 4,
+                 policy: ResizePolicy = None, maxlen: int = None, on_evict: Callable[[T], None] = None,
+                 stats: DequeStats = None):
         """
         Initializes an instance of a CircularDeque
         :param data: starting data to add to the deque, for testing purposes
         :param front: where to begin the insertions, for testing purposes
         :param capacity: number of slots in the Deque
+        :param policy: growth/shrink rules, defaults to doubling and halving with a minimum capacity of 4
+        :param maxlen: if given, the deque is bounded: it holds at most maxlen elements in a fixed
+            buffer, and enqueuing onto a full deque evicts an element from the opposite end instead of growing
+        :param on_evict: called with every element a bounded deque evicts
+        :param stats: counters to record operations and resizes in, None to skip instrumentation
         """
         if data is None and front != 0:
             # front will get set to 0 by front_enqueue if the initial data is empty
             data = ['Start']
         elif data is None:
             data = []
+        if maxlen is not None:
+            if maxlen < 1 or len(data) > maxlen:
+                raise ValueError("maxlen must be at least 1 and at least the length of data")
+            capacity = maxlen
 
+        self.maxlen: int = maxlen
+        self.on_evict: Callable[[T], None] = on_evict
+        self.evicted: int = 0
+        self.stats: DequeStats = stats
         self.capacity: int = capacity
         self.size: int = len(data)
         self.queue: List[T] = [None] * capacity
         self.back: int = None if not data else self.size + front - 1
         self.front: int = front if data else None
+        self.policy: ResizePolicy = policy if policy is not None else DEFAULT_POLICY
+        # size at or below which dequeue shrinks, cached so the hot path does a single comparison
+        self.shrink_size: int = self.policy.shrink_size(capacity) if maxlen is None else -1
 
         for index, value in enumerate(data):
             self.queue[index + front] = value
+        if stats is not None:
+            stats.seen_capacity(capacity)
+            stats.peak_size = max(stats.peak_size, self.size)
 
     def __str__(self) -> str:
         """
@@ -76,6 +275,47 @@ class CircularDeque:
         """
         return self.size
 
+    def __iter__(self) -> Iterator[T]:
+        """
+        Yields the elements from front to back without copying the underlying list
+        Time complexity: O(n) for the whole iteration, Space complexity: O(1)
+        """
+        if self.size == 0:
+            return
+        queue, front, size = self.queue, self.front, self.size
+        first = min(size, self.capacity - front)
+        for index in range(front, front + first):
+            yield queue[index]
+        for index in range(size - first):
+            yield queue[index]
+
+    def __reversed__(self) -> Iterator[T]:
+        """
+        Yields the elements from back to front without copying the underlying list
+        Time complexity: O(n) for the whole iteration, Space complexity: O(1)
+        """
+        if self.size == 0:
+            return
+        queue, front, size = self.queue, self.front, self.size
+        first = min(size, self.capacity - front)
+        for index in range(size - first - 1, -1, -1):
+            yield queue[index]
+        for index in range(front + first - 1, front - 1, -1):
+            yield queue[index]
+
+    def __getitem__(self, index: int) -> T:
+        """
+        Returns the element `index` places from the front, negative indices count from the back
+        param index: int: position of the element
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: the element, raises IndexError if index is out of range
+        """
+        if not -self.size <= index < self.size:
+            raise IndexError("CircularDeque index out of range")
+        if index < 0:
+            index += self.size
+        return self.queue[(self.front + index) % self.capacity]
+
     def is_empty(self) -> bool:
         """
         Returns a boolean indicating if the circular deque is empty
@@ -108,50 +348,47 @@ class CircularDeque:
 
     def grow(self) -> None:
         """
-        Doubles the capacity of CD by creating a new underlying python list with double the capacity of
-        the old one and copies the values over from the current list.
+        Grows the capacity of CD (doubles it by default) by creating a new underlying python list
+        and copying the values over from the current list with at most two slices.
         The new copied list will be 'unrolled' s.t. the front element will be at index 0 and
          the tail element will be at index [size - 1].
         Time complexity: O(n) img * Space complexity: O(n)
         Returns: None
         """
-        old = self.queue    # make a copy of old queue
-        self.capacity = 2 * self.capacity       # double cap
-        self.queue = [None] * self.capacity     # make a new queue with the doubled capacity
-
-        # old queue front index
-        walk = self.front
-        for i in range(self.size):      # only consider existing elements
-            self.queue[i] = old[walk]   # copy the first element from last queue to new queue at index 0
-            walk = (1+walk) % len(old)  # use old size as modulo, this moves to the next index in old queue
-        self.front = 0      # set new front to be at beginning of queue
-        self.back = self.size - 1
+        self._resize(self.policy.grown(self.capacity, self.size))
 
     def shrink(self) -> None:
         """
-        Cuts the capacity of the queue in half using the same idea as grow.
-        Copy over contents of the old list to a new list with half the capacity.
+        Cuts the capacity of the queue (in half by default) using the same idea as grow.
+        Copy over contents of the old list to a new list with the smaller capacity.
         The new copied list will be 'unrolled' s.t. the
         front element will be at index 0 and the tail element will be at index [size - 1].
-        Will never have a capacity lower than 4, DO NOT shrink when shrinking would result in a capacity <= 4
+        Will never have a capacity lower than the policy's min_capacity (4 by default)
         Time complexity: O(n), Space complexity: O(n)
         Returns: None
         """
-        old = self.queue
+        self._resize(self.policy.shrunk(self.capacity, self.size))
 
-        # if self.capacity > 4:
-        new_capacity = self.capacity // 2
-        if new_capacity < 4:
-            new_capacity = 4
-        # self.capacity = self.capacity // 2
-        self.queue = [None] * new_capacity
-        walk = self.front
-        for i in range(self.size):
-            self.queue[i] = old[walk]
-            walk = (1+walk) % len(old)
-        self.front = 0
-        self.back = self.size - 1
-        self.capacity = new_capacity
+    def reserve(self, count: int) -> None:
+        """
+        Makes sure `count` elements fit without the deque having to grow, resizing at most once.
+        Dequeues may still shrink the deque afterwards as the policy dictates
+        param count: number of elements the deque must be able to hold
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        if count >= self.capacity and self.maxlen is None:
+            self._resize(self.policy.grown(self.capacity, count))
+
+    def shrink_to_fit(self) -> None:
+        """
+        Shrinks the capacity to the smallest the policy allows for the current size
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        capacity = max(self.policy.min_capacity, self.size + 1)
+        if capacity < self.capacity and self.maxlen is None:
+            self._resize(capacity)
 
     def enqueue(self, value: T, front: bool = True) -> None:
         """
@@ -162,6 +399,9 @@ class CircularDeque:
         Time complexity: O(1)*, Space complexity: O(1)*
         Returns: None
         """
+        if self.size == self.capacity:
+            # only a bounded deque is ever full: make room by evicting from the opposite end
+            self._evict(1, not front)
         if front:
             # add to front of queue
             # if there isn't a front yet, set front and back = 0
@@ -181,9 +421,11 @@ class CircularDeque:
                 self.back = (self.back+1) % self.capacity  # new back index
             self.queue[self.back] = value
         self.size += 1
+        if self.stats is not None:
+            self.stats.enqueued(front, 1, self.size)
 
         # resize if capacity has been reached, Call grow() if the size of the list has reached capacity
-        if self.size == self.capacity:
+        if self.size == self.capacity and self.maxlen is None:
             self.grow()
 
     def dequeue(self, front: bool = True) -> T:
@@ -211,438 +453,3868 @@ class CircularDeque:
             self.back = (self.back - 1) % len(self.queue)  # back index is decremented
 
         self.size -= 1
-        # Calls shrink() If the current size is less than or equal to 1/4 the current capacity,
-        # and 1/2 the current capacity is greater than or equal to 4, halves the capacity.
-        if (self.size <= (1/4 * self.capacity)) and (1/2 * self.capacity >= 4):
+        if self.stats is not None:
+            self.stats.dequeued(front, 1)
+        # Calls shrink() once the size drops to the policy's threshold (by default: at most 1/4 of the
+        # capacity, and only while 1/2 the capacity is greater than or equal to 4)
+        if self.size <= self.shrink_size:
             self.shrink()
         return removed_item
 
-class CDLLNode:
-    """
-    Node for the CDLL
-    """
+    def _evict(self, count: int, front: bool) -> None:
+        """
+        Drops `count` elements from the front or back of a bounded deque, counting them in
+        `evicted` and passing each one to `on_evict` if it is set
+        Time complexity: O(count), Space complexity: O(count)
+        Returns: None
+        """
+        evicted = [self.dequeue(front)] if count == 1 else self.pop_many(count, front)
+        self.evicted += count
+        if self.on_evict is not None:
+            for value in evicted:
+                self.on_evict(value)
 
-    __slots__ = ['val', 'next', 'prev']
+    def __getstate__(self) -> tuple:
+        """
+        Pickles only the live elements, front to back, plus the configuration,
+        instead of the whole underlying list with its stale slots
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: the state tuple passed to __setstate__
+        """
+        items = self._read(self.front, self.size) if self.size else []
+        return items, self.capacity, self.policy, self.maxlen, self.on_evict, self.evicted, self.stats
 
-    def __init__(self, val: T, next: CDLLNode = None, prev: CDLLNode = None) -> None:
+    def __setstate__(self, state: tuple) -> None:
         """
-        Creates a CDLL node
-        :param val: value stored by the next
-        :param next: the next node in the list
-        :param prev: the previous node in the list
-        :return: None
+        Rebuilds an unpickled deque from __getstate__'s tuple, unrolled s.t. the front element is at index 0
+        Time complexity: O(capacity), Space complexity: O(capacity)
+        Returns: None
         """
-        self.val = val
-        self.next = next
-        self.prev = prev
+        items, capacity, self.policy, self.maxlen, self.on_evict, self.evicted, self.stats = state
+        self.capacity = capacity
+        self.size = len(items)
+        self.queue = items + [None] * (capacity - self.size)
+        self.shrink_size = self.policy.shrink_size(capacity) if self.maxlen is None else -1
+        self._set_front(0)
 
-    def __eq__(self, other: CDLLNode) -> bool:
+    def _read(self, start: int, count: int) -> List[T]:
         """
-        Compares two CDLLNodes by value
-        :param other: The other node
-        :return: true if comparison is true, else false
+        Copies `count` consecutive slots starting at index `start` out of the underlying list,
+        wrapping around the end with at most two slices
+        Time complexity: O(count), Space complexity: O(count)
+        Returns: list of the copied values, in deque order
         """
-        return self.val == other.val
+        first = min(count, self.capacity - start)
+        if first == count:
+            return self.queue[start:start + count]
+        return self.queue[start:] + self.queue[:count - first]
 
-    def __str__(self) -> str:
+    def _write(self, start: int, values: List[T]) -> None:
         """
-        Returns a string representation of the node
-        :return: string
+        Copies `values` into consecutive slots starting at index `start`,
+        wrapping around the end with at most two slice assignments
+        Time complexity: O(len(values)), Space complexity: O(1)
+        Returns: None
         """
-        return "<= (" + str(self.val) + ") =>"
+        count = len(values)
+        first = min(count, self.capacity - start)
+        self.queue[start:start + first] = values[:first]
+        if first < count:
+            self.queue[:count - first] = values[first:]
 
-    __repr__ = __str__
+    def _set_front(self, front: int) -> None:
+        """
+        Moves the front index to `front` and places the back index `size - 1` slots after it
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None
+        """
+        self.front = front
+        self.back = (front + self.size - 1) % self.capacity
+
+    def _resize(self, capacity: int) -> None:
+        """
+        Moves the live elements into a new underlying list with the given capacity,
+        unrolled s.t. the front element is at index 0 and the back element is at index [size - 1]
+        Copies contiguous runs with at most two slices instead of walking element by element
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        started = perf_counter() if self.stats is not None else 0
+        old_capacity = self.capacity
+        queue = [None] * capacity
+        if self.size:
+            queue[:self.size] = self._read(self.front, self.size)
+        self.queue = queue
+        self.capacity = capacity
+        self.shrink_size = self.policy.shrink_size(capacity) if self.maxlen is None else -1
+        self.front = 0
+        self.back = self.size - 1
+        if self.stats is not None:
+            self.stats.resized(old_capacity, capacity, self.size, perf_counter() - started)
 
+    def extend(self, values: Iterable[T], front: bool = False) -> None:
+        """
+        Adds every value in `values` to the front or back of the circular deque, in order,
+        as if enqueue had been called once per value.
+        Extending the front therefore leaves the last value of `values` as the new front element.
+        Capacity is reserved once up front and the values are copied in with at most two slice assignments
+        param values: Iterable[T]: values to add into the circular deque
+        param front: where to add the values
+        Time complexity: O(k) for k values, Space complexity: O(k)
+        Returns: None
+        """
+        values = values if isinstance(values, list) else list(values)
+        count = len(values)
+        if count == 0:
+            return
 
-class CDLL:
-    """
-    A (C)ircular (D)oubly (L)inked (L)ist
-    """
+        if self.maxlen is not None:
+            # a bounded deque evicts what it already holds from the opposite end first,
+            # then the earliest of the new values if there are more than maxlen of them
+            if self.size + count > self.maxlen:
+                self._evict(min(self.size + count - self.maxlen, self.size), not front)
+            if count > self.maxlen:
+                dropped, values = values[:count - self.maxlen], values[count - self.maxlen:]
+                self.evicted += len(dropped)
+                if self.on_evict is not None:
+                    for value in dropped:
+                        self.on_evict(value)
+                count = self.maxlen
+        # reserve enough room up front that the deque is not full once every value is in
+        elif self.size + count >= self.capacity:
+            self._resize(self.policy.grown(self.capacity, self.size + count))
+        start = self.front if self.front is not None else 0
 
-    __slots__ = ['head', 'size']
+        if front:
+            start = (start - count) % self.capacity
+            self._write(start, values[::-1])
+        else:
+            self._write((start + self.size) % self.capacity, values)
+        self.size += count
+        self._set_front(start)
+        if self.stats is not None:
+            self.stats.enqueued(front, count, self.size)
 
-    def __init__(self) -> None:
+    def concat(self, other: 'CircularDeque') -> None:
         """
-        Creates a CDLL
-        :return: None
+        Moves every element of `other` onto the back of this deque, in order, and empties `other`.
+        The elements are copied out of and into the ring buffers with slices, and this deque resizes at most once
+        (a bounded deque evicts from the front instead, as extend would)
+        param other: CircularDeque: the deque to take the elements of
+        Time complexity: O(m) for m elements in other, Space complexity: O(m)
+        Returns: None
         """
-        self.size = 0
-        self.head = None
+        if other is self:
+            raise ValueError("cannot concatenate a deque with itself")
+        if other.size == 0:
+            return
+        self.extend(other._read(other.front, other.size))
+        other.clear()
 
-    def __len__(self) -> int:
+    def pop_many(self, count: int, front: bool = True) -> List[T]:
         """
-        :return: the size of the CDLL
+        Removes up to `count` items from the front or back of the circular deque,
+        as if dequeue had been called once per item.
+        The removed items are copied out with at most two slices and the deque shrinks at most once
+        param count: maximum number of items to remove
+        param front: Whether to remove the front or back items from the dequeue
+        Time complexity: O(k) for k items, Space complexity: O(k)
+        Returns: list of the removed items in the order they were removed, empty if the deque is empty
         """
-        return self.size
+        count = min(count, self.size)
+        if count <= 0:
+            return []
 
-    def __eq__(self, other: 'CDLL') -> bool:
+        if front:
+            removed = self._read(self.front, count)
+        else:
+            removed = self._read((self.front + self.size - count) % self.capacity, count)
+            removed.reverse()
+        self._drop(count, front)
+        return removed
+
+    def _drop(self, count: int, front: bool) -> None:
         """
-        Compares two CDLLs by value
-        :param other: the other CDLL
-        :return: true if comparison is true, else false
+        Moves the front or back index past `count` elements, then applies every shrink that
+        single dequeues would have triggered with a single copy
+        Time complexity: O(1), or O(n) if the deque shrinks, Space complexity: O(n) if the deque shrinks
+        Returns: None
         """
-        n1: CDLLNode = self.head
-        n2: CDLLNode = other.head
-        for _ in range(self.size):
-            if n1 != n2:
-                return False
-            n1, n2 = n1.next, n2.next
-        return True
+        start = self.front
+        if front:
+            start = (start + count) % self.capacity
+        self.size -= count
+        self._set_front(start)
+        if self.stats is not None:
+            self.stats.dequeued(front, count)
 
-    def __str__(self) -> str:
+        if self.size <= self.shrink_size:
+            capacity = self.capacity
+            while self.size <= self.policy.shrink_size(capacity):
+                capacity = self.policy.shrunk(capacity, self.size)
+            self._resize(capacity)
+
+    def clear(self) -> None:
         """
-        :return: a string representation of the CDLL
+        Empties the circular deque by swapping in a fresh underlying list, so every reference is dropped at once
+        and no shrink cascade runs. Unbounded deques restart at the policy's minimum capacity.
+        The dropped elements count as front dequeues, as they would for truncate_front
+        Time complexity: O(1) for unbounded deques, Space complexity: O(1)
+        Returns: None
         """
-        n1: CDLLNode = self.head
-        joinable: List[str] = []
-        while n1 is not self.head:
-            joinable.append(str(n1))
-            n1 = n1.next
-        return ''.join(joinable)
+        if self.stats is not None and self.size:
+            self.stats.dequeued(True, self.size)
+        self.size = 0
+        self._resize(self.capacity if self.maxlen is not None else self.policy.min_capacity)
 
-    __repr__ = __str__
+    def truncate_front(self, count: int) -> None:
+        """
+        Discards up to `count` items from the front, resizing at most once
+        param count: maximum number of items to discard
+        Time complexity: O(k), Space complexity: O(1), or O(n) if the deque shrinks
+        Returns: None
+        """
+        self._truncate(count, True)
 
-    def insert(self, val: T, front: bool = True) -> None:
+    def truncate_back(self, count: int) -> None:
         """
-        inserts a node with value val in the front or back of the CDLL
-        Don't forget to keep it circular!!
-        param val: T: the value to insert
-        param front: bool = True:  whether to insert in the front of the list, or the back.
-        Time Complexity: O(1), Space Complexity: O(1)
-        return: None
+        Discards up to `count` items from the back, resizing at most once
+        param count: maximum number of items to discard
+        Time complexity: O(k), Space complexity: O(1), or O(n) if the deque shrinks
+        Returns: None
         """
-        new_node = CDLLNode(val)
-        # if empty, add it
-        if self.size == 0:
-            self.head = new_node
-            new_node.prev = new_node
-            new_node.next = new_node
-        else:
-            if front:
-                new_node.next = self.head
-                new_node.prev = self.head.prev
-                self.head.prev = new_node
-                self.head = new_node
-                self.head.prev.next = new_node   # making it circular by connecting the previous last node to the new node.
-            else:
-                # insert to back
-                new_node.next = self.head
-                new_node.prev = self.head.prev
-                # Connect the previous last node to the new node.
-                self.head.prev.next = new_node
-                self.head.prev = new_node
-        self.size += 1
+        self._truncate(count, False)
 
-    def remove(self, front: bool = True) -> None:
+    def _truncate(self, count: int, front: bool) -> None:
         """
-        removes a node from the CDLL
-        Don't forget to keep it circular!!
-        If the list is empty, do nothing
-        param front: bool = True: whether to remove from the front of the list, or the back
-        Time Complexity: O(1)
-        Space Complexity: O(1)
-        return: None
+        Discards up to `count` items from the front or back, overwriting their slots so the
+        deque does not keep them alive
+        """
+        count = min(count, self.size)
+        if count <= 0:
+            return
+        if count == self.size:
+            if self.stats is not None:
+                self.stats.dequeued(front, count)
+            # already counted from the right end, so clear has nothing left to count
+            self.size = 0
+            self.clear()
+            return
+        start = self.front if front else (self.front + self.size - count) % self.capacity
+        self._write(start, [None] * count)
+        self._drop(count, front)
+
+    def rotate(self, steps: int = 1) -> None:
+        """
+        Rotates the circular deque `steps` places to the right, so the back element becomes the front
+        when steps is 1. Negative steps rotate to the left.
+        Implemented as an index shift: only the min(k, n - k) elements that cross the wrap are copied,
+        with at most two slices, and none at all when the deque is full (bounded deques)
+        param steps: number of places to rotate
+        Time complexity: O(min(k, n - k)), Space complexity: O(min(k, n - k))
+        Returns: None
         """
         if self.size == 0:
             return
-        if self.size == 1:
-            self.head = None
-            self.size -= 1
+        steps %= self.size
+        if steps == 0:
             return
-        if front:
-            # remove first element (head) , 3, 2, 1 -- 2,1
-            self.head.next.prev = self.head.prev  # setting 2nd element prev pointer
-            self.head.prev.next = self.head.next    # adjusting last element to point to 2nd index
-            self.head = self.head.next      # 2nd element is the new head
+        if self.size == self.capacity:
+            self._set_front((self.front - steps) % self.capacity)
+        elif steps <= self.size - steps:
+            # move the last `steps` elements round to the front
+            start = (self.front - steps) % self.capacity
+            self._write(start, self._read((self.front + self.size - steps) % self.capacity, steps))
+            self._set_front(start)
         else:
-            # remove last element (tail),  1,2,3  -- 1,2
-            self.head.prev.prev.next = self.head   # making element before tail to point to head
-            self.head.prev = self.head.prev.prev    # adjusting head's prev pointer to point to element before tail
-        self.size -= 1
+            # move the first `size - steps` elements round to the back
+            moved = self.size - steps
+            self._write((self.front + self.size) % self.capacity, self._read(self.front, moved))
+            self._set_front((self.front + moved) % self.capacity)
 
-
-class CDLLCD:
+class MaskedCircularDeque(CircularDeque):
     """
-    (C)ircular (D)oubly (L)inked (L)ist (C)ircular (D)equeue
-    This is essentially just an interface for the above
+    CircularDeque whose capacity is always a power of two, so index wrap-around is a bitwise
+    and with a cached mask instead of a modulo.
+    The deque is represented by a head index (front) plus its size; back is derived from them,
+    so enqueue and dequeue never branch on an empty deque's missing front/back
     """
 
-    def __init__(self) -> None:
+    __slots__ = ['mask']
+
+    def __init__(self, data: List[T] = None, front: int = 0, capacity: int = 4,
+                 policy: ResizePolicy = None, stats: DequeStats = None):
         """
-        Initializes the CDLLCD to an empty CDLL
-        :return: None
+        Initializes an instance of a MaskedCircularDeque
+        :param data: starting data to add to the deque
+        :param front: where to begin the insertions, wrapped into the capacity
+        :param capacity: minimum number of slots in the Deque, rounded up to a power of two
+        :param policy: growth/shrink rules, both factors must be powers of two
+        :param stats: counters to record operations and resizes in, None to skip instrumentation
         """
-        self.CDLL: CDLL = CDLL()
+        policy = _power_of_two_policy(policy)
+        data = [] if data is None else data
+        capacity = _power_of_two(max(capacity, policy.min_capacity, len(data) + 1))
 
-    def __eq__(self, other: 'CDLLCD') -> bool:
+        self.policy: ResizePolicy = policy
+        self.maxlen: int = None
+        self.on_evict: Callable[[T], None] = None
+        self.evicted: int = 0
+        self.stats: DequeStats = stats
+        self.capacity: int = capacity
+        self.mask: int = capacity - 1
+        self.shrink_size: int = policy.shrink_size(capacity)
+        self.size: int = len(data)
+        self.queue: List[T] = [None] * capacity
+        self.front: int = front & self.mask
+        self._write(self.front, data)
+        if stats is not None:
+            stats.seen_capacity(capacity)
+            stats.peak_size = max(stats.peak_size, self.size)
+
+    def __setstate__(self, state: tuple) -> None:
         """
-        Compares two CDLLCDs by value
-        :param other: the other CDLLCD
-        :return: true if equal, else false
+        Rebuilds an unpickled deque, see CircularDeque.__getstate__
+        Time complexity: O(capacity), Space complexity: O(capacity)
+        Returns: None
         """
-        return self.CDLL == other.CDLL
+        super().__setstate__(state)
+        self.mask = self.capacity - 1
 
-    def __str__(self) -> str:
+    @property
+    def back(self) -> int:
         """
-        :return: string representation of the CDLLCD
+        Index of the back element, derived from the head index and the size
+        Returns: the index, None if the deque is empty
         """
-        return str(self.CDLL)
+        if self.size == 0:
+            return None
+        return (self.front + self.size - 1) & self.mask
 
-    __repr__ = __str__
-
-    def __len__(self) -> int:
+    def _set_front(self, front: int) -> None:
         """
-        Returns the length/size of the CDLLCD, and hence the underlying CDLL.
-        This is a magic method and can be called with len(object_to_measure)
-        Time complexity: O(1)
-        Space complexity: O(1)
-        Returns: int representing length of the CDLLCD
+        Moves the head index to `front`; back follows from the size
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None
         """
-        return self.CDLL.size
+        self.front = front
 
-    def is_empty(self) -> bool:
+    def _resize(self, capacity: int) -> None:
         """
-        Returns a boolean indicating if the CDLLCD is empty
-        Time complexity: O(1)
-        Space complexity: O(1)
-        Returns: True if empty, False otherwise
+        Moves the live elements into a new underlying list whose capacity is `capacity`
+        rounded up to a power of two, unrolled s.t. the front element is at index 0
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
         """
-        if self.CDLL.size == 0:
-            return True
-        return False
+        started = perf_counter() if self.stats is not None else 0
+        old_capacity = self.capacity
+        capacity = _power_of_two(capacity)
+        queue = [None] * capacity
+        if self.size:
+            queue[:self.size] = self._read(self.front, self.size)
+        self.queue = queue
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.shrink_size = self.policy.shrink_size(capacity)
+        self.front = 0
+        if self.stats is not None:
+            self.stats.resized(old_capacity, capacity, self.size, perf_counter() - started)
 
     def front_element(self) -> T:
         """
-        Returns the first element in the CDLLCD
-        Time complexity: O(1)
-        Space Complexity: O(1)
+        Returns the first element in the circular deque
+        Time complexity: O(1), Space Complexity: O(1)
         Returns: the first element if it exists, otherwise None
         """
-        if self.CDLL.head is not None:
-            return self.CDLL.head.val   # Access the 'val' attribute of the CDLLNode
+        if self.size:
+            return self.queue[self.front]
         return None
 
     def back_element(self) -> T:
         """
-        Returns the last element in the CDLLCD
-        Time complexity: O(1)
-        Space complexity: O(1)
+        Returns the last element in the circular deque
+        Time complexity: O(1), Space complexity: O(1)
         Returns: the last element if it exists, otherwise None
         """
-        if self.CDLL.head:
-            return self.CDLL.head.prev.val
+        if self.size:
+            return self.queue[(self.front + self.size - 1) & self.mask]
         return None
 
-    def enqueue(self, val: T, front: bool = True) -> None:
+    def enqueue(self, value: T, front: bool = True) -> None:
         """
-        Adds a value to the CDLLCD
-        Must use the insert function of the CDLL class
-        param val: T: the value to be added
-        param front: bool = True: whether to add to the front or the back of the deque
-        Time complexity: O(1)
-        Space complexity: O(1)
-        return: None
+        Add a value to either the front or back of the circular deque based off the parameter front
+        param value: T: value to add into the circular deque
+        param value front: where to add value T
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: None
         """
         if front:
-            self.CDLL.insert(val, front=True)
+            self.front = (self.front - 1) & self.mask
+            self.queue[self.front] = value
         else:
-            self.CDLL.insert(val, front=False)
+            self.queue[(self.front + self.size) & self.mask] = value
+        self.size += 1
+        if self.stats is not None:
+            self.stats.enqueued(front, 1, self.size)
+
+        if self.size == self.capacity:
+            self.grow()
 
     def dequeue(self, front: bool = True) -> T:
         """
-        Removes a value from the deque, returning it
-        Must use the remove function of the CDLL class
-        param front: bool = True: whether to remove from the front or the back of the deque
-        Time complexity: O(1), Space complexity: O(1)
-        return: The dequeued element, None if empty
+        Remove an item from the queue
+        Removes the front item by default, remove the back item if False is passed in
+        param front: Whether to remove the front or back item from the dequeue
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if empty
         """
-        # empty
-        if self.CDLL.size == 0:
+        if self.size == 0:
             return None
-
         if front:
-            removed = self.CDLL.head.val
-            self.CDLL.remove(front=True)
+            removed_item = self.queue[self.front]
+            self.front = (self.front + 1) & self.mask
         else:
-            removed = self.CDLL.head.prev.val
-            self.CDLL.remove(front=False)
-        return removed
+            removed_item = self.queue[(self.front + self.size - 1) & self.mask]
+
+        self.size -= 1
+        if self.stats is not None:
+            self.stats.dequeued(front, 1)
+        if self.size <= self.shrink_size:
+            self.shrink()
+        return removed_item
+
+
+def _power_of_two(value: int) -> int:
+    """
+    Rounds `value` up to the nearest power of two
+    :param value: a positive integer
+    :return: the smallest power of two that is >= value
+    """
+    return 1 << (value - 1).bit_length()
+
+
+def _power_of_two_policy(policy: ResizePolicy) -> ResizePolicy:
+    """
+    Checks that a policy keeps capacities at powers of two
+    :param policy: the policy to check, None for the default policy
+    :return: the policy to use
+    """
+    policy = policy if policy is not None else DEFAULT_POLICY
+    for factor in (policy.growth_factor, policy.shrink_factor):
+        if factor != int(factor) or int(factor) & (int(factor) - 1):
+            raise ValueError("mask-indexed deques need power of two growth and shrink factors")
+    return policy
 
 
-def plot_speed():
+class TypedCircularDeque:
     """
-    Compares performance of the CDLLCD and the standard array based deque
+    Circular Deque of fixed-width numbers stored unboxed in an array.array ring buffer,
+    so each element costs only the width of its dtype.
+    Capacity is kept at a power of two and indexed with a mask, like MaskedCircularDeque
     """
 
-    # First we'll test sequences of basic operations
+    __slots__ = ['dtype', 'capacity', 'size', 'queue', 'front', 'mask', 'policy', 'shrink_size']
+
+    def __init__(self, dtype: str = 'd', data: Iterable[T] = None, capacity: int = 16,
+                 policy: ResizePolicy = None):
+        """
+        Initializes an instance of a TypedCircularDeque
+        :param dtype: array.array typecode of the elements, e.g. 'd' for float64 or 'q' for int64
+        :param data: starting data to add to the back of the deque
+        :param capacity: minimum number of slots in the Deque, rounded up to a power of two
+        :param policy: growth/shrink rules, both factors must be powers of two
+        """
+        self.dtype: str = dtype
+        self.policy: ResizePolicy = _power_of_two_policy(policy)
+        self.capacity: int = _power_of_two(max(capacity, self.policy.min_capacity))
+        self.mask: int = self.capacity - 1
+        self.shrink_size: int = self.policy.shrink_size(self.capacity)
+        self.queue: array = array(dtype, bytes(array(dtype).itemsize * self.capacity))
+        self.front: int = 0
+        self.size: int = 0
+        if data is not None:
+            self.extend(data)
+
+    def __str__(self) -> str:
+        """
+        Provides a string representation of a TypedCircularDeque, front to back
+        :return: the instance as a string
+        """
+        if self.size == 0:
+            return f"TypedCircularDeque('{self.dtype}') <empty>"
+        values = ",".join(str(value) for value in self._read(self.front, self.size))
+        return f"TypedCircularDeque('{self.dtype}') <{values}>"
+
+    __repr__ = __str__
+
+    def __len__(self) -> int:
+        """
+        Returns the number of items currently in the deque
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: int representing length of the deque
+        """
+        return self.size
+
+    def is_empty(self) -> bool:
+        """
+        Returns a boolean indicating if the deque is empty
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: True if empty, False otherwise
+        """
+        return self.size == 0
+
+    def front_element(self) -> T:
+        """
+        Returns the first element in the deque
+        Time complexity: O(1), Space Complexity: O(1)
+        Returns: the first element if it exists, otherwise None
+        """
+        if self.size:
+            return self.queue[self.front]
+        return None
+
+    def back_element(self) -> T:
+        """
+        Returns the last element in the deque
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: the last element if it exists, otherwise None
+        """
+        if self.size:
+            return self.queue[(self.front + self.size - 1) & self.mask]
+        return None
 
-    sizes = [100*i for i in range(0, 200, 5)]
+    def _as_array(self, values: Iterable[T]) -> array:
+        """
+        Converts `values` to an array of this deque's dtype, copying raw bytes when
+        `values` exposes a contiguous buffer of the same format (e.g. an array.array or a NumPy array)
+        Returns: the values as an array
+        """
+        if isinstance(values, array) and values.typecode == self.dtype:
+            return values
+        try:
+            view = memoryview(values)
+        except TypeError:
+            return array(self.dtype, values)
+        if view.format != self.dtype or not view.c_contiguous:
+            return array(self.dtype, view.tolist())
+        converted = array(self.dtype)
+        converted.frombytes(view.cast('B'))
+        return converted
+
+    def tobytes(self) -> bytes:
+        """
+        Copies the live elements, front to back, into one contiguous bytes object in the machine's
+        native layout, the same layout array.array(dtype).frombytes reads back
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: bytes of size * itemsize
+        """
+        return b''.join(view.tobytes() for view in self.views())
 
-    # (1) Grow large
-    grow_avgs_array = []
-    grow_avgs_CDLL = []
+    def __getstate__(self) -> tuple:
+        """
+        Pickles the live elements as one raw buffer instead of one object per element
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: the state tuple passed to __setstate__
+        """
+        return self.dtype, self.tobytes(), self.capacity, self.policy
 
-    for size in sizes:
-        grow_avgs_array.append(0)
-        grow_avgs_CDLL.append(0)
-        data = list(range(size))
-        for trial in range(3):
+    def __setstate__(self, state: tuple) -> None:
+        """
+        Rebuilds an unpickled deque from __getstate__'s tuple, unrolled s.t. the front element is at index 0
+        Time complexity: O(capacity), Space complexity: O(capacity)
+        Returns: None
+        """
+        self.dtype, data, self.capacity, self.policy = state
+        self.queue = array(self.dtype)
+        self.queue.frombytes(data)
+        self.size = len(self.queue)
+        self.queue.frombytes(bytes(self.queue.itemsize * (self.capacity - self.size)))
+        self.mask = self.capacity - 1
+        self.shrink_size = self.policy.shrink_size(self.capacity)
+        self.front = 0
 
-            gc.collect()  # What happens if you remove this? Hint: memory fragmention
-            cd_array = CircularDeque()
-            cd_DLL = CDLLCD()
+    def _read(self, start: int, count: int) -> array:
+        """
+        Copies `count` consecutive slots starting at index `start`, wrapping with at most two slices
+        Time complexity: O(count), Space complexity: O(count)
+        Returns: array of the copied values, in deque order
+        """
+        first = min(count, self.capacity - start)
+        if first == count:
+            return self.queue[start:start + count]
+        return self.queue[start:] + self.queue[:count - first]
 
-            # randomize data
-            shuffle(data)
+    def _write(self, start: int, values: array) -> None:
+        """
+        Copies `values` into consecutive slots starting at index `start`, wrapping with at most two slices
+        Time complexity: O(len(values)), Space complexity: O(1)
+        Returns: None
+        """
+        count = len(values)
+        first = min(count, self.capacity - start)
+        self.queue[start:start + first] = values[:first]
+        if first < count:
+            self.queue[:count - first] = values[first:]
 
-            start = default_timer()
-            for item in data:
-                cd_array.enqueue(item, item % 2)
-            grow_avgs_array[-1] += (default_timer() - start)/3
+    def _resize(self, capacity: int) -> None:
+        """
+        Moves the live elements into a new array whose capacity is `capacity` rounded up to a power of two,
+        unrolled s.t. the front element is at index 0
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        capacity = _power_of_two(capacity)
+        queue = self._read(self.front, self.size) if self.size else array(self.dtype)
+        queue.frombytes(bytes(queue.itemsize * (capacity - self.size)))
+        self.queue = queue
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.shrink_size = self.policy.shrink_size(capacity)
+        self.front = 0
 
-            start = default_timer()
-            for item in data:
-                cd_DLL.enqueue(item, item % 2)
-            grow_avgs_CDLL[-1] += (default_timer() - start)/3
+    def grow(self) -> None:
+        """
+        Grows the capacity by the policy's growth factor, copying the live elements with at most two slices
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        self._resize(self.policy.grown(self.capacity, self.size))
 
-    plt.plot(sizes, grow_avgs_array, color='blue', label='Array')
-    plt.plot(sizes, grow_avgs_CDLL, color='red', label='CDLL')
-    plt.title("Enqueue and Grow")
-    plt.legend(loc='best')
-    plt.show()
+    def shrink(self) -> None:
+        """
+        Shrinks the capacity by the policy's shrink factor, copying the live elements with at most two slices
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        self._resize(self.policy.shrunk(self.capacity, self.size))
 
-    # (2) Grow Large then Shrink to zero
+    def enqueue(self, value: T, front: bool = True) -> None:
+        """
+        Add a value to either the front or back of the deque based off the parameter front
+        param value: T: value to add, must fit the dtype
+        param front: where to add value T
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: None, raises like array.array if value does not fit, leaving the deque unchanged
+        """
+        if front:
+            # store before moving front, so a value the array rejects changes nothing
+            slot = (self.front - 1) & self.mask
+            self.queue[slot] = value
+            self.front = slot
+        else:
+            self.queue[(self.front + self.size) & self.mask] = value
+        self.size += 1
 
-    shrink_avgs_array = []
-    shrink_avgs_CDLL = []
+        if self.size == self.capacity:
+            self.grow()
 
-    for size in sizes:
-        shrink_avgs_array.append(0)
-        shrink_avgs_CDLL.append(0)
-        data = list(range(size))
+    def dequeue(self, front: bool = True) -> T:
+        """
+        Remove an item from the deque
+        Removes the front item by default, remove the back item if False is passed in
+        param front: Whether to remove the front or back item
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if empty
+        """
+        if self.size == 0:
+            return None
+        if front:
+            removed_item = self.queue[self.front]
+            self.front = (self.front + 1) & self.mask
+        else:
+            removed_item = self.queue[(self.front + self.size - 1) & self.mask]
 
-        for trial in range(3):
+        self.size -= 1
+        if self.size <= self.shrink_size:
+            self.shrink()
+        return removed_item
 
-            gc.collect()
-            cd_array = CircularDeque()
-            cd_DLL = CDLLCD()
+    def extend(self, values: Iterable[T], front: bool = False) -> None:
+        """
+        Adds every value in `values` to the front or back of the deque, in order,
+        as if enqueue had been called once per value.
+        Buffers of the same dtype are copied in as raw bytes, then written with at most two slice assignments
+        param values: Iterable[T]: values to add
+        param front: where to add the values
+        Time complexity: O(k) for k values, Space complexity: O(k)
+        Returns: None
+        """
+        values = self._as_array(values)
+        count = len(values)
+        if count == 0:
+            return
+        if self.size + count >= self.capacity:
+            self._resize(self.policy.grown(self.capacity, self.size + count))
 
-            # randomize data
-            shuffle(data)
+        if front:
+            values = values[::-1]
+            self.front = (self.front - count) & self.mask
+            self._write(self.front, values)
+        else:
+            self._write((self.front + self.size) & self.mask, values)
+        self.size += count
 
-            start = default_timer()
-            for item in data:
-                cd_array.enqueue(item, item % 2)
-            for item in data:
-                cd_array.dequeue(not item % 2)
-            shrink_avgs_array[-1] += (default_timer() - start)/3
+    def pop_many(self, count: int, front: bool = True) -> array:
+        """
+        Removes up to `count` items from the front or back of the deque,
+        as if dequeue had been called once per item. The deque shrinks at most once
+        param count: maximum number of items to remove
+        param front: Whether to remove the front or back items
+        Time complexity: O(k) for k items, Space complexity: O(k)
+        Returns: array of the removed items in the order they were removed
+        """
+        count = min(count, self.size)
+        if count <= 0:
+            return array(self.dtype)
 
-            start = default_timer()
-            for item in data:
-                cd_DLL.enqueue(item, item % 2)
-            for item in data:
-                cd_DLL.dequeue(not item % 2)
-            shrink_avgs_CDLL[-1] += (default_timer() - start)/3
+        if front:
+            removed = self._read(self.front, count)
+            self.front = (self.front + count) & self.mask
+        else:
+            removed = self._read((self.front + self.size - count) & self.mask, count)
+            removed.reverse()
+        self.size -= count
 
-    plt.plot(sizes, shrink_avgs_array, color='blue', label='Array')
-    plt.plot(sizes, shrink_avgs_CDLL, color='red', label='CDLL')
-    plt.title("Enqueue, Grow, Dequeue, Shrink")
-    plt.legend(loc='best')
-    plt.show()
+        capacity = self.capacity
+        while self.size <= self.policy.shrink_size(capacity):
+            capacity = _power_of_two(self.policy.shrunk(capacity, self.size))
+        if capacity != self.capacity:
+            self._resize(capacity)
+        return removed
 
-    # (3) Test with random operations
+    def views(self) -> Tuple[memoryview, ...]:
+        """
+        Exposes the live elements without copying, as one or two memoryviews that read
+        front to back when concatenated. The views share memory with the deque and are
+        only meaningful until it is next modified
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: tuple of one memoryview, or two if the elements wrap around the end of the buffer
+        """
+        buffer = memoryview(self.queue)
+        first = min(self.size, self.capacity - self.front)
+        if first == self.size:
+            return (buffer[self.front:self.front + self.size],)
+        return buffer[self.front:], buffer[:self.size - first]
 
-    random_avgs_array = []
-    random_avgs_CDLL = []
 
-    for size in sizes:
-        random_avgs_array.append(0)
-        random_avgs_CDLL.append(0)
-        data = list(range(size))
+class _NodeOwner:
+    """
+    Identifies the CDLL a node belongs to, so a node handle can be checked against the list it is used on.
+    Owners form a union-find forest: concatenating two CDLLs links the lower-ranked root under the other,
+    which moves every absorbed node in O(1), and a check compresses the path it walks up to the root
+    """
 
-        for trial in range(3):
+    __slots__ = ['parent', 'rank']
 
-            gc.collect()
-            cd_array = CircularDeque()
-            cd_DLL = CDLLCD()
+    def __init__(self) -> None:
+        """
+        Creates a root owner
+        :return: None
+        """
+        self.parent: '_NodeOwner' = None
+        # upper bound on the height of the tree below this owner
+        self.rank: int = 0
 
-            shuffle(data)
 
-            start = default_timer()
-            for item in data:
-                if randint(0, 3) <= 2:
-                    cd_array.enqueue(item, item % 2)
-                else:
-                    cd_array.dequeue(item % 2)
-            random_avgs_array[-1] += (default_timer() - start)/3
+class CDLLNode:
+    """
+    Node for the CDLL
+    Nodes compare and hash by identity, so they are safe to keep in sets and as dict keys;
+    compare their `val` attributes to compare the values they hold
+    """
 
-            start = default_timer()
-            for item in data:
-                if randint(0, 3) <= 2:
-                    cd_DLL.enqueue(item, item % 2)
-                else:
-                    cd_DLL.dequeue(item % 2)
-            random_avgs_CDLL[-1] += (default_timer() - start)/3
+    __slots__ = ['val', 'next', 'prev', 'owner']
 
-    plt.plot(sizes, random_avgs_array, color='blue', label='Array')
-    plt.plot(sizes, random_avgs_CDLL, color='red', label='CDLL')
-    plt.title("Operations in Random Order")
-    plt.legend(loc='best')
-    plt.show()
+    def __init__(self, val: T, next: CDLLNode = None, prev: CDLLNode = None) -> None:
+        """
+        Creates a CDLL node
+        :param val: value stored by the next
+        :param next: the next node in the list
+        :param prev: the previous node in the list
+        :return: None
+        """
+        self.val = val
+        self.next = next
+        self.prev = prev
+        # the _NodeOwner of the CDLL holding the node, None once it has been removed
+        self.owner = None
 
-    def max_len_subarray(data, bound, structure):
+    def __str__(self) -> str:
         """
-        returns the length of the largest subarray of `data` with sum less or eq to than `bound`
-        :param data: list of integers to operate on
-        :param bound: largest allowable sum
-        :param structure: either a CircularDeque or a CDLLCD
-        :return: the length
+        Returns a string representation of the node
+        :return: string
         """
-        index, max_len, subarray_sum = 0, 0, 0
-        while index < len(data):
+        return "<= (" + str(self.val) + ") =>"
+
+    __repr__ = __str__
+
 
-            while subarray_sum <= bound and index < len(data):
-                structure.enqueue(data[index])
-                subarray_sum += data[index]
-                index += 1
-            max_len = max(max_len, subarray_sum)
+class CDLL:
+    """
+    A (C)ircular (D)oubly (L)inked (L)ist
+    """
 
-            while subarray_sum > bound:
-                subarray_sum -= structure.dequeue(False)
+    __slots__ = ['head', 'size', 'pool', 'pool_size', 'owner']
+
+    def __init__(self, pool_size: int = 0) -> None:
+        """
+        Creates a CDLL
+        :param pool_size: how many removed nodes to keep for reuse by later inserts,
+            0 disables pooling so removed nodes are left to the garbage collector
+        :return: None
+        """
+        self.size = 0
+        self.head = None
+        self.pool: List[CDLLNode] = []
+        self.pool_size: int = pool_size
+        # stamped on every node this CDLL holds, replaced whenever nodes leave in bulk
+        self.owner: _NodeOwner = _NodeOwner()
 
-        return max_len
+    def __getstate__(self) -> tuple:
+        """
+        Pickles the values as a flat list, front to back, so pickle never recurses through the node chain.
+        Pooled nodes are not kept
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: the state tuple passed to __setstate__
+        """
+        return list(self), self.pool_size
 
-    # (4) A common application
+    def __setstate__(self, state: tuple) -> None:
+        """
+        Relinks an unpickled CDLL from __getstate__'s tuple
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        values, pool_size = state
+        self.__init__(pool_size)
+        for val in values:
+            self.insert(val, False)
 
-    application_avgs_array = []
-    application_avgs_CDLL = []
+    def __len__(self) -> int:
+        """
+        :return: the size of the CDLL
+        """
+        return self.size
 
-    data = [randint(0, 1) for i in range(5000)]
-    window_lengths = list(range(0, 200, 5))
+    def __iter__(self) -> Iterator[T]:
+        """
+        Yields the values from front to back
+        """
+        node = self.head
+        for _ in range(self.size):
+            yield node.val
+            node = node.next
 
-    for length in window_lengths:
-        application_avgs_array.append(0)
-        application_avgs_CDLL.append(0)
+    def __reversed__(self) -> Iterator[T]:
+        """
+        Yields the values from back to front
+        """
+        node = self.head
+        for _ in range(self.size):
+            node = node.prev
+            yield node.val
 
-        for trial in range(3):
+    def __getitem__(self, index: int) -> T:
+        """
+        Returns the value `index` places from the front, negative indices count from the back
+        Walks from whichever side of the head is closer
+        Time Complexity: O(min(i, n - i)), Space Complexity: O(1)
+        return: the value, raises IndexError if index is out of range
+        """
+        return self._node_at(index).val
 
-            gc.collect()
-            cd_array = CircularDeque()
-            cd_DLL = CDLLCD()
+    def _node_at(self, index: int) -> CDLLNode:
+        """
+        Finds the node `index` places from the front, walking from whichever side of the head is closer
+        Time Complexity: O(min(i, n - i)), Space Complexity: O(1)
+        return: the node, raises IndexError if index is out of range
+        """
+        if not -self.size <= index < self.size:
+            raise IndexError("CDLL index out of range")
+        index %= self.size
+        node = self.head
+        if index <= self.size - index:
+            for _ in range(index):
+                node = node.next
+        else:
+            for _ in range(self.size - index):
+                node = node.prev
+        return node
 
-            start = default_timer()
-            max_len_subarray(data, length, cd_array)
-            application_avgs_array[-1] += (default_timer() - start)/3
+    def rotate(self, steps: int = 1) -> None:
+        """
+        Rotates the CDLL `steps` places to the right by moving the head pointer, no node is relinked
+        Negative steps rotate to the left
+        Time Complexity: O(min(k, n - k)), Space Complexity: O(1)
+        return: None
+        """
+        if self.size:
+            self.head = self._node_at(-steps % self.size)
 
-            start = default_timer()
-            max_len_subarray(data, length, cd_DLL)
-            application_avgs_CDLL[-1] += (default_timer() - start)/3
+    def __eq__(self, other: 'CDLL') -> bool:
+        """
+        Compares two CDLLs by value, checking the sizes first
+        :param other: the other CDLL
+        :return: true if comparison is true, else false
+        """
+        if self.size != other.size:
+            return False
+        n1: CDLLNode = self.head
+        n2: CDLLNode = other.head
+        for _ in range(self.size):
+            if n1.val != n2.val:
+                return False
+            n1, n2 = n1.next, n2.next
+        return True
+
+    def __str__(self) -> str:
+        """
+        Only the first and last REPR_EDGE values are shown for long lists, so no more nodes than that are visited
+        :return: a string representation of the CDLL
+        """
+        return _ring_str(iter(self), reversed(self), self.size)
+
+    __repr__ = __str__
+
+    def _new_node(self, val: T) -> CDLLNode:
+        """
+        Takes a node from the pool, or allocates one if the pool is empty
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the unlinked node holding val
+        """
+        if self.pool:
+            # reuse a recycled node rather than allocating a new one
+            new_node = self.pool.pop()
+            new_node.val = val
+        else:
+            new_node = CDLLNode(val)
+        new_node.owner = self.owner
+        return new_node
+
+    def _release(self, node: CDLLNode) -> T:
+        """
+        Marks an unlinked node as removed, pooling it if the pool has room
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the value the node held
+        """
+        value = node.val
+        node.next = node.prev = node.owner = None
+        if len(self.pool) < self.pool_size:
+            # drop the value too so the pool keeps nothing else alive
+            node.val = None
+            self.pool.append(node)
+        return value
+
+    def _check_handle(self, node: CDLLNode) -> None:
+        """
+        Raises ValueError unless `node` is in this CDLL: removed nodes, nodes dropped by clear or truncate
+        and nodes split off into another CDLL are all rejected.
+        Every owner passed on the way to the root is pointed straight at it, so with union by rank
+        in concat a check costs O(α(n)) amortized, effectively constant
+        Time Complexity: O(α(n)) amortized, Space Complexity: O(1)
+        """
+        owner = node.owner
+        if owner is self.owner:
+            return
+        root = owner
+        while root is not None and root.parent is not None:
+            root = root.parent
+        if root is not self.owner:
+            raise ValueError("stale node handle: the node is not in this CDLL")
+        while owner is not root:
+            owner.parent, owner = root, owner.parent
+        node.owner = root
+
+    def insert(self, val: T, front: bool = True) -> CDLLNode:
+        """
+        inserts a node with value val in the front or back of the CDLL
+        Don't forget to keep it circular!!
+        param val: T: the value to insert
+        param front: bool = True:  whether to insert in the front of the list, or the back.
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the new node, an opaque handle for remove_node, insert_after and move_to_front
+        """
+        new_node = self._new_node(val)
+        # if empty, add it
+        if self.size == 0:
+            self.head = new_node
+            new_node.prev = new_node
+            new_node.next = new_node
+        else:
+            if front:
+                new_node.next = self.head
+                new_node.prev = self.head.prev
+                self.head.prev = new_node
+                self.head = new_node
+                self.head.prev.next = new_node   # making it circular by connecting the previous last node to the new node.
+            else:
+                # insert to back
+                new_node.next = self.head
+                new_node.prev = self.head.prev
+                # Connect the previous last node to the new node.
+                self.head.prev.next = new_node
+                self.head.prev = new_node
+        self.size += 1
+        return new_node
+
+    def remove(self, front: bool = True) -> None:
+        """
+        removes a node from the CDLL
+        Don't forget to keep it circular!!
+        If the list is empty, do nothing
+        param front: bool = True: whether to remove from the front of the list, or the back
+        Time Complexity: O(1)
+        Space Complexity: O(1)
+        return: the value of the removed node, None if the list is empty
+        """
+        if self.size == 0:
+            return None
+        if self.size == 1:
+            removed = self.head
+            self.head = None
+            self.size -= 1
+        elif front:
+            # remove first element (head) , 3, 2, 1 -- 2,1
+            removed = self.head
+            self.head.next.prev = self.head.prev  # setting 2nd element prev pointer
+            self.head.prev.next = self.head.next    # adjusting last element to point to 2nd index
+            self.head = self.head.next      # 2nd element is the new head
+            self.size -= 1
+        else:
+            # remove last element (tail),  1,2,3  -- 1,2
+            removed = self.head.prev
+            self.head.prev.prev.next = self.head   # making element before tail to point to head
+            self.head.prev = self.head.prev.prev    # adjusting head's prev pointer to point to element before tail
+            self.size -= 1
+
+        return self._release(removed)
+
+    def remove_node(self, node: CDLLNode) -> T:
+        """
+        Removes the node behind a handle returned by insert or insert_after, wherever it is in the CDLL.
+        Handles of nodes that have left this CDLL are rejected, except that with pooling a removed
+        handle must not be reused, since its node may have been recycled by a later insert
+        param node: CDLLNode: handle of a node in this CDLL
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the value of the removed node, raises ValueError if the handle is stale
+        """
+        self._check_handle(node)
+        if node is self.head:
+            return self.remove(front=True)
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        self.size -= 1
+        return self._release(node)
+
+    def insert_after(self, node: CDLLNode, val: T) -> CDLLNode:
+        """
+        Inserts a node with value val right after the node behind a handle
+        param node: CDLLNode: handle of a node in this CDLL
+        param val: T: the value to insert
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the new node's handle, raises ValueError if the handle is stale
+        """
+        self._check_handle(node)
+        new_node = self._new_node(val)
+        new_node.prev = node
+        new_node.next = node.next
+        node.next.prev = new_node
+        node.next = new_node
+        self.size += 1
+        return new_node
+
+    def move_to_front(self, node: CDLLNode) -> None:
+        """
+        Relinks the node behind a handle to the front of the CDLL, keeping the order of the others
+        param node: CDLLNode: handle of a node in this CDLL
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: None, raises ValueError if the handle is stale
+        """
+        self._check_handle(node)
+        if node is self.head:
+            return
+        if node is not self.head.prev:
+            # unlink it, then splice it in between the tail and the head
+            node.prev.next = node.next
+            node.next.prev = node.prev
+            node.prev = self.head.prev
+            node.next = self.head
+            self.head.prev.next = node
+            self.head.prev = node
+        # the tail already sits just before the head in the ring
+        self.head = node
+
+    def peek(self, front: bool = True) -> T:
+        """
+        Returns the value at the front or back of the CDLL without removing it
+        param front: bool = True: whether to look at the front of the list, or the back
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the value, None if the list is empty
+        """
+        if self.head is None:
+            return None
+        return self.head.val if front else self.head.prev.val
+
+    def clear(self) -> None:
+        """
+        Empties the CDLL by detaching the whole ring in one step; the garbage collector reclaims the nodes.
+        Taking a new owner makes every handle into the old ring stale without visiting its nodes
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: None
+        """
+        self.head = None
+        self.size = 0
+        self.owner = _NodeOwner()
+
+    def truncate(self, count: int, front: bool = True) -> None:
+        """
+        Removes up to `count` nodes from the front or back of the CDLL, splicing the rest of the ring
+        back together once. The cut is found walking from whichever side of the head is closer,
+        and handles of the removed nodes become stale
+        param count: maximum number of nodes to remove
+        param front: bool = True: whether to remove from the front of the list, or the back
+        Time Complexity: O(min(k, n - k)), Space Complexity: O(1)
+        return: None
+        """
+        count = min(count, self.size)
+        if count <= 0:
+            return
+        if count == self.size:
+            self.clear()
+            return
+        head, tail = self.head, self.head.prev
+        # make the dropped handles stale, restamping whichever side is smaller
+        if count <= self.size - count:
+            node = head if front else tail
+            for _ in range(count):
+                node.owner = None
+                node = node.next if front else node.prev
+        else:
+            owner = self.owner = _NodeOwner()
+            node = self._node_at(count) if front else head
+            for _ in range(self.size - count):
+                node.owner = owner
+                node = node.next
+        if front:
+            first = self._node_at(count)
+            first.prev, tail.next = tail, first
+            self.head = first
+        else:
+            last = self._node_at(self.size - count - 1)
+            last.next, head.prev = head, last
+        self.size -= count
+
+    def concat(self, other: 'CDLL') -> None:
+        """
+        Splices the whole ring of `other` onto the back of this CDLL and leaves `other` empty.
+        Node handles from `other` stay valid and now belong to this CDLL
+        param other: CDLL: the list to take the nodes of
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: None
+        """
+        if other is self:
+            raise ValueError("cannot concatenate a CDLL with itself")
+        if other.size == 0:
+            return
+        if self.size == 0:
+            self.head = other.head
+        else:
+            head, tail = self.head, self.head.prev
+            other_head, other_tail = other.head, other.head.prev
+            tail.next, other_head.prev = other_head, tail
+            other_tail.next, head.prev = head, other_tail
+        self.size += other.size
+        other.head = None
+        other.size = 0
+        # hand every moved node to this CDLL at once, keeping the shallower owner tree below the deeper one
+        mine, theirs = self.owner, other.owner
+        if mine.rank < theirs.rank:
+            mine.parent = self.owner = theirs
+        else:
+            theirs.parent = mine
+            if mine.rank == theirs.rank:
+                mine.rank += 1
+        other.owner = _NodeOwner()
+
+    def split_at(self, index: int) -> 'CDLL':
+        """
+        Cuts the CDLL in two: this CDLL keeps the first `index` values and the rest move to a new CDLL.
+        The cut is found walking from whichever side of the head is closer, and both rings are closed
+        by relinking their ends. Node handles follow their nodes into whichever CDLL now holds them
+        param index: int: number of values to keep, from 0 to size
+        Time Complexity: O(min(k, n - k)), Space Complexity: O(1)
+        return: a new CDLL holding the values from `index` on, raises IndexError if index is out of range
+        """
+        if not 0 <= index <= self.size:
+            raise IndexError("CDLL split index out of range")
+        rest = CDLL(self.pool_size)
+        if index == self.size:
+            return rest
+        if index == 0:
+            rest.head, rest.size, rest.owner = self.head, self.size, self.owner
+            self.clear()
+            return rest
+        first = self._node_at(index)
+        # restamp whichever side is smaller; the larger side keeps the old owner
+        if index <= self.size - index:
+            rest.owner, self.owner = self.owner, _NodeOwner()
+            node, owner, count = self.head, self.owner, index
+        else:
+            node, owner, count = first, rest.owner, self.size - index
+        for _ in range(count):
+            node.owner = owner
+            node = node.next
+        head, tail, last = self.head, self.head.prev, first.prev
+        last.next, head.prev = head, last
+        tail.next, first.prev = first, tail
+        rest.head, rest.size = first, self.size - index
+        self.size = index
+        return rest
+
+    def trim(self, count: int = 0) -> None:
+        """
+        Releases pooled nodes to the garbage collector until at most `count` remain
+        param count: number of pooled nodes to keep
+        Time Complexity: O(released nodes), Space Complexity: O(1)
+        return: None
+        """
+        del self.pool[count:]
+
+
+# number of values shown from each end when printing a long linked deque
+REPR_EDGE = 10
+
+
+def _ring_str(values: Iterator[T], reverse: Iterator[T], size: int) -> str:
+    """
+    Formats the values of a linked deque as "<= (value) =>" cells, eliding the middle of long deques
+    :param values: lazy iterator over the values from front to back
+    :param reverse: lazy iterator over the values from back to front
+    :param size: number of values
+    :return: the string, built from at most 2 * REPR_EDGE values
+    """
+    if size <= 2 * REPR_EDGE:
+        return ''.join("<= (" + str(val) + ") =>" for val in values)
+    tail = list(islice(reverse, REPR_EDGE))
+    tail.reverse()
+    return (''.join("<= (" + str(val) + ") =>" for val in islice(values, REPR_EDGE))
+            + f" ... {size - 2 * REPR_EDGE} more ... "
+            + ''.join("<= (" + str(val) + ") =>" for val in tail))
+
+
+class CDLLBlock:
+    """
+    Node for the BlockCDLL, holding a fixed-size run of values
+    Live values occupy vals[lo:hi]
+    """
+
+    __slots__ = ['vals', 'lo', 'hi', 'next', 'prev']
+
+    def __init__(self, block_size: int, lo: int) -> None:
+        """
+        Creates an empty block
+        :param block_size: number of value slots in the block
+        :param lo: slot index at which the (empty) live range starts
+        :return: None
+        """
+        self.vals: List[T] = [None] * block_size
+        self.lo: int = lo
+        self.hi: int = lo
+        self.next: 'CDLLBlock' = None
+        self.prev: 'CDLLBlock' = None
+
+    def __str__(self) -> str:
+        """
+        Returns a string representation of the block
+        :return: string
+        """
+        return "<= " + str(self.vals[self.lo:self.hi]) + " =>"
+
+    __repr__ = __str__
+
+
+class BlockCDLL:
+    """
+    An unrolled (C)ircular (D)oubly (L)inked (L)ist: a ring of CDLLBlocks that each hold up to
+    block_size values, like the blocks behind collections.deque.
+    Values cost one list slot each instead of a whole node, and the ends stay O(1) with no
+    large reallocations. Offers the same insert/remove/peek interface as CDLL
+    """
+
+    __slots__ = ['head', 'size', 'block_size', 'spare']
+
+    def __init__(self, block_size: int = 64) -> None:
+        """
+        Creates a BlockCDLL
+        :param block_size: number of values per block
+        :return: None
+        """
+        if block_size < 2:
+            raise ValueError("block_size must be at least 2")
+        self.size: int = 0
+        self.head: CDLLBlock = None
+        self.block_size: int = block_size
+        # one emptied block kept back, so pushing and popping across a block boundary does not thrash
+        self.spare: CDLLBlock = None
+
+    def __getstate__(self) -> tuple:
+        """
+        Pickles the values as a flat list, front to back, so pickle never recurses through the block chain
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: the state tuple passed to __setstate__
+        """
+        return list(self), self.block_size
+
+    def __setstate__(self, state: tuple) -> None:
+        """
+        Relinks an unpickled BlockCDLL from __getstate__'s tuple
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        values, block_size = state
+        self.__init__(block_size)
+        for val in values:
+            self.insert(val, False)
+
+    def __len__(self) -> int:
+        """
+        :return: the size of the BlockCDLL
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Yields the values from front to back
+        """
+        block = self.head
+        while block is not None:
+            yield from block.vals[block.lo:block.hi]
+            block = block.next if block.next is not self.head else None
+
+    def __reversed__(self) -> Iterator[T]:
+        """
+        Yields the values from back to front
+        """
+        block = self.head.prev if self.head is not None else None
+        while block is not None:
+            yield from reversed(block.vals[block.lo:block.hi])
+            block = block.prev if block is not self.head else None
+
+    def __getitem__(self, index: int) -> T:
+        """
+        Returns the value `index` places from the front, negative indices count from the back
+        Walks whole blocks from whichever end is closer
+        Time Complexity: O(min(i, n - i) / block_size), Space Complexity: O(1)
+        return: the value, raises IndexError if index is out of range
+        """
+        if not -self.size <= index < self.size:
+            raise IndexError("BlockCDLL index out of range")
+        index %= self.size
+        if index <= self.size - index:
+            block = self.head
+            while index >= block.hi - block.lo:
+                index -= block.hi - block.lo
+                block = block.next
+            return block.vals[block.lo + index]
+        index = self.size - index
+        block = self.head.prev
+        while index > block.hi - block.lo:
+            index -= block.hi - block.lo
+            block = block.prev
+        return block.vals[block.hi - index]
+
+    def __eq__(self, other: 'BlockCDLL') -> bool:
+        """
+        Compares two BlockCDLLs by value
+        :param other: the other BlockCDLL
+        :return: true if comparison is true, else false
+        """
+        if self.size != other.size:
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def __str__(self) -> str:
+        """
+        Only the first and last REPR_EDGE values are shown for long lists
+        :return: a string representation of the BlockCDLL
+        """
+        return _ring_str(iter(self), reversed(self), self.size)
+
+    __repr__ = __str__
+
+    def _new_block(self, lo: int) -> CDLLBlock:
+        """
+        Returns an empty block whose live range starts at `lo`, reusing the spare block if there is one
+        """
+        block = self.spare
+        if block is None:
+            return CDLLBlock(self.block_size, lo)
+        self.spare = None
+        block.lo = block.hi = lo
+        return block
+
+    def _unlink(self, block: CDLLBlock) -> None:
+        """
+        Removes an emptied block from the ring and keeps it as the spare
+        """
+        if block.next is block:
+            self.head = None
+        else:
+            block.prev.next = block.next
+            block.next.prev = block.prev
+            if block is self.head:
+                self.head = block.next
+        block.next = block.prev = None
+        self.spare = block
+
+    def insert(self, val: T, front: bool = True) -> None:
+        """
+        inserts val in the front or back of the BlockCDLL, adding a block when the end block is full
+        param val: T: the value to insert
+        param front: bool = True:  whether to insert in the front of the list, or the back.
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: None
+        """
+        head = self.head
+        if head is None:
+            # start in the middle of the block so both ends have room
+            head = self.head = self._new_block(self.block_size // 2)
+            head.next = head.prev = head
+
+        if front:
+            if head.lo == 0:
+                block = self._new_block(self.block_size)
+                block.next, block.prev = head, head.prev
+                head.prev.next = head.prev = block
+                head = self.head = block
+            head.lo -= 1
+            head.vals[head.lo] = val
+        else:
+            tail = head.prev
+            if tail.hi == self.block_size:
+                block = self._new_block(0)
+                block.next, block.prev = head, tail
+                tail.next = head.prev = block
+                tail = block
+            tail.vals[tail.hi] = val
+            tail.hi += 1
+        self.size += 1
+
+    def remove(self, front: bool = True) -> T:
+        """
+        removes a value from the front or back of the BlockCDLL, dropping its block once empty
+        If the list is empty, do nothing
+        param front: bool = True: whether to remove from the front of the list, or the back
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the removed value, None if the list is empty
+        """
+        if self.size == 0:
+            return None
+        if front:
+            block = self.head
+            value = block.vals[block.lo]
+            block.vals[block.lo] = None
+            block.lo += 1
+        else:
+            block = self.head.prev
+            block.hi -= 1
+            value = block.vals[block.hi]
+            block.vals[block.hi] = None
+        if block.lo == block.hi:
+            self._unlink(block)
+        self.size -= 1
+        return value
+
+    def peek(self, front: bool = True) -> T:
+        """
+        Returns the value at the front or back of the BlockCDLL without removing it
+        param front: bool = True: whether to look at the front of the list, or the back
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: the value, None if the list is empty
+        """
+        if self.head is None:
+            return None
+        if front:
+            return self.head.vals[self.head.lo]
+        tail = self.head.prev
+        return tail.vals[tail.hi - 1]
+
+    def clear(self) -> None:
+        """
+        Empties the BlockCDLL by detaching the whole ring of blocks in one step
+        Time Complexity: O(1), Space Complexity: O(1)
+        return: None
+        """
+        self.head = None
+        self.size = 0
+
+    def truncate(self, count: int, front: bool = True) -> None:
+        """
+        Removes up to `count` values from the front or back of the BlockCDLL, dropping whole blocks
+        at a time and trimming at most one partial block. Only the last dropped block is kept, emptied,
+        as the spare, so no dropped value stays referenced
+        param count: maximum number of values to remove
+        param front: bool = True: whether to remove from the front of the list, or the back
+        Time Complexity: O(k / block_size + block_size), Space Complexity: O(1)
+        return: None
+        """
+        count = min(count, self.size)
+        if count <= 0:
+            return
+        if count == self.size:
+            self.clear()
+            return
+        self.size -= count
+        while True:
+            block = self.head if front else self.head.prev
+            held = block.hi - block.lo
+            if count < held:
+                break
+            count -= held
+            # the block may become the spare, which must not keep its old values alive
+            block.vals[block.lo:block.hi] = [None] * held
+            self._unlink(block)
+        if front:
+            block.vals[block.lo:block.lo + count] = [None] * count
+            block.lo += count
+        else:
+            block.vals[block.hi - count:block.hi] = [None] * count
+            block.hi -= count
+
+    def concat(self, other: 'BlockCDLL') -> None:
+        """
+        Splices the whole ring of blocks of `other` onto the back of this BlockCDLL and leaves `other` empty.
+        The partial blocks at the seam stay partial. Lists with different block sizes cannot share blocks,
+        so their values are copied instead
+        param other: BlockCDLL: the list to take the values of
+        Time Complexity: O(1), O(m) for m values if the block sizes differ, Space Complexity: O(1)
+        return: None
+        """
+        if other is self:
+            raise ValueError("cannot concatenate a BlockCDLL with itself")
+        if other.size == 0:
+            return
+        if other.block_size != self.block_size:
+            for val in other:
+                self.insert(val, False)
+        else:
+            if self.size == 0:
+                self.head = other.head
+            else:
+                head, tail = self.head, self.head.prev
+                other_head, other_tail = other.head, other.head.prev
+                tail.next, other_head.prev = other_head, tail
+                other_tail.next, head.prev = head, other_tail
+            self.size += other.size
+        other.clear()
+
+    def split_at(self, index: int) -> 'BlockCDLL':
+        """
+        Cuts the BlockCDLL in two: this list keeps the first `index` values and the rest move to a new BlockCDLL.
+        Whole blocks are walked from whichever end is closer; only the block holding the cut is copied
+        param index: int: number of values to keep, from 0 to size
+        Time Complexity: O(min(k, n - k) / block_size + block_size), Space Complexity: O(block_size)
+        return: a new BlockCDLL holding the values from `index` on, raises IndexError if index is out of range
+        """
+        if not 0 <= index <= self.size:
+            raise IndexError("BlockCDLL split index out of range")
+        rest = BlockCDLL(self.block_size)
+        if index == self.size:
+            return rest
+        if index == 0:
+            rest.head, rest.size = self.head, self.size
+            self.clear()
+            return rest
+
+        # find the block holding value `index` and its offset in the block's live range
+        if index <= self.size - index:
+            block, offset = self.head, index
+            while offset >= block.hi - block.lo:
+                offset -= block.hi - block.lo
+                block = block.next
+        else:
+            block, remaining = self.head.prev, self.size - index
+            while remaining > block.hi - block.lo:
+                remaining -= block.hi - block.lo
+                block = block.prev
+            offset = block.hi - block.lo - remaining
+        if offset:
+            # move the block's values from the cut on into a new block right after it
+            cut = block.lo + offset
+            moved = CDLLBlock(self.block_size, cut)
+            moved.hi = block.hi
+            moved.vals[cut:block.hi] = block.vals[cut:block.hi]
+            block.vals[cut:block.hi] = [None] * (block.hi - cut)
+            block.hi = cut
+            moved.prev, moved.next = block, block.next
+            block.next.prev = moved
+            block.next = moved
+            block = moved
+
+        head, tail, last = self.head, self.head.prev, block.prev
+        last.next, head.prev = head, last
+        tail.next, block.prev = block, tail
+        rest.head, rest.size = block, self.size - index
+        self.size = index
+        return rest
+
+    def rotate(self, steps: int = 1) -> None:
+        """
+        Rotates the BlockCDLL `steps` places to the right, moving min(k, n - k) values between the ends
+        Negative steps rotate to the left
+        Time Complexity: O(min(k, n - k)), Space Complexity: O(1)
+        return: None
+        """
+        if self.size == 0:
+            return
+        steps %= self.size
+        if steps <= self.size - steps:
+            for _ in range(steps):
+                self.insert(self.remove(front=False), front=True)
+        else:
+            for _ in range(self.size - steps):
+                self.insert(self.remove(front=True), front=False)
+
+
+class CDLLCD:
+    """
+    (C)ircular (D)oubly (L)inked (L)ist (C)ircular (D)equeue
+    This is essentially just an interface for the above
+    """
+
+    def __init__(self, pool_size: int = 0, block_size: int = None, stats: DequeStats = None) -> None:
+        """
+        Initializes the CDLLCD to an empty CDLL
+        :param pool_size: how many removed nodes the CDLL keeps for reuse, see CDLL
+        :param block_size: if given, store the values in a BlockCDLL with this many values per block
+            instead of one CDLLNode per value
+        :param stats: counters to record operations in, None to skip instrumentation.
+            A linked deque never resizes, so only the operation counts and peak size move
+        :return: None
+        """
+        self.CDLL: CDLL = CDLL(pool_size) if block_size is None else BlockCDLL(block_size)
+        self.stats: DequeStats = stats
+
+    def __eq__(self, other: 'CDLLCD') -> bool:
+        """
+        Compares two CDLLCDs by value, checking the sizes first
+        :param other: the other CDLLCD
+        :return: true if equal, else false
+        """
+        if type(self.CDLL) is type(other.CDLL):
+            return self.CDLL == other.CDLL
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __str__(self) -> str:
+        """
+        :return: string representation of the CDLLCD
+        """
+        return str(self.CDLL)
+
+    __repr__ = __str__
+
+    def __len__(self) -> int:
+        """
+        Returns the length/size of the CDLLCD, and hence the underlying CDLL.
+        This is a magic method and can be called with len(object_to_measure)
+        Time complexity: O(1)
+        Space complexity: O(1)
+        Returns: int representing length of the CDLLCD
+        """
+        return self.CDLL.size
+
+    def __iter__(self) -> Iterator[T]:
+        """
+        Yields the elements from front to back
+        Time complexity: O(n) for the whole iteration, Space complexity: O(1)
+        """
+        return iter(self.CDLL)
+
+    def __reversed__(self) -> Iterator[T]:
+        """
+        Yields the elements from back to front
+        Time complexity: O(n) for the whole iteration, Space complexity: O(1)
+        """
+        return reversed(self.CDLL)
+
+    def __getitem__(self, index: int) -> T:
+        """
+        Returns the element `index` places from the front, negative indices count from the back
+        param index: int: position of the element
+        Time complexity: O(min(i, n - i)), Space complexity: O(1)
+        Returns: the element, raises IndexError if index is out of range
+        """
+        return self.CDLL[index]
+
+    def clear(self) -> None:
+        """
+        Empties the CDLLCD, detaching the underlying ring in one step.
+        The dropped elements count as front dequeues, as they would for truncate_front
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None
+        """
+        if self.stats is not None and self.CDLL.size:
+            self.stats.dequeued(True, self.CDLL.size)
+        self.CDLL.clear()
+
+    def truncate_front(self, count: int) -> None:
+        """
+        Discards up to `count` items from the front
+        param count: maximum number of items to discard
+        Time complexity: O(min(k, n - k)), Space complexity: O(1)
+        Returns: None
+        """
+        if self.stats is not None:
+            self.stats.dequeued(True, min(count, self.CDLL.size))
+        self.CDLL.truncate(count, front=True)
+
+    def truncate_back(self, count: int) -> None:
+        """
+        Discards up to `count` items from the back
+        param count: maximum number of items to discard
+        Time complexity: O(min(k, n - k)), Space complexity: O(1)
+        Returns: None
+        """
+        if self.stats is not None:
+            self.stats.dequeued(False, min(count, self.CDLL.size))
+        self.CDLL.truncate(count, front=False)
+
+    def rotate(self, steps: int = 1) -> None:
+        """
+        Rotates the CDLLCD `steps` places to the right, so the back element becomes the front when
+        steps is 1. Negative steps rotate to the left.
+        On the node backend this only moves the head pointer
+        param steps: number of places to rotate
+        Time complexity: O(min(k, n - k)), Space complexity: O(1)
+        Returns: None
+        """
+        self.CDLL.rotate(steps)
+
+    def concat(self, other: 'CDLLCD') -> None:
+        """
+        Moves every value of `other` onto the back of this CDLLCD and leaves `other` empty.
+        Two CDLLCDs on the same backend splice their rings, see CDLL.concat and BlockCDLL.concat;
+        mixed backends copy the values. Like CircularDeque.concat, the values count as enqueued at the back
+        of this deque and dequeued from the front of `other`
+        param other: CDLLCD: the deque to take the values of
+        Time complexity: O(1) on matching backends, O(m) for m values otherwise, Space complexity: O(1)
+        Returns: None
+        """
+        if other is self:
+            raise ValueError("cannot concatenate a deque with itself")
+        count = other.CDLL.size
+        if type(self.CDLL) is type(other.CDLL):
+            self.CDLL.concat(other.CDLL)
+        else:
+            for val in other.CDLL:
+                self.CDLL.insert(val, False)
+            other.CDLL.clear()
+        if self.stats is not None and count:
+            self.stats.enqueued(False, count, self.CDLL.size)
+        if other.stats is not None and count:
+            other.stats.dequeued(True, count)
+
+    def split_at(self, index: int) -> 'CDLLCD':
+        """
+        Cuts the CDLLCD in two: this deque keeps the first `index` values and the rest move to a new
+        CDLLCD on the same backend, see CDLL.split_at and BlockCDLL.split_at.
+        The moved values count as dequeued from the back of this deque; if it has stats, the new deque
+        gets its own DequeStats, with the same on_resize, that counts them as enqueued at its back
+        param index: int: number of values to keep, from 0 to size
+        Time complexity: O(min(k, n - k)), Space complexity: O(1)
+        Returns: a new CDLLCD holding the values from `index` on, raises IndexError if index is out of range
+        """
+        rest = CDLLCD()
+        rest.CDLL = self.CDLL.split_at(index)
+        moved = rest.CDLL.size
+        if self.stats is not None:
+            rest.stats = DequeStats(self.stats.on_resize)
+            if moved:
+                self.stats.dequeued(False, moved)
+                rest.stats.enqueued(False, moved, moved)
+        return rest
+
+    def is_empty(self) -> bool:
+        """
+        Returns a boolean indicating if the CDLLCD is empty
+        Time complexity: O(1)
+        Space complexity: O(1)
+        Returns: True if empty, False otherwise
+        """
+        if self.CDLL.size == 0:
+            return True
+        return False
+
+    def front_element(self) -> T:
+        """
+        Returns the first element in the CDLLCD
+        Time complexity: O(1)
+        Space Complexity: O(1)
+        Returns: the first element if it exists, otherwise None
+        """
+        return self.CDLL.peek(front=True)
+
+    def back_element(self) -> T:
+        """
+        Returns the last element in the CDLLCD
+        Time complexity: O(1)
+        Space complexity: O(1)
+        Returns: the last element if it exists, otherwise None
+        """
+        return self.CDLL.peek(front=False)
+
+    def enqueue(self, val: T, front: bool = True) -> CDLLNode:
+        """
+        Adds a value to the CDLLCD
+        Must use the insert function of the CDLL class
+        param val: T: the value to be added
+        param front: bool = True: whether to add to the front or the back of the deque
+        Time complexity: O(1)
+        Space complexity: O(1)
+        return: the node handle on the node backend, see CDLL.insert, None on the block backend
+        """
+        node = self.CDLL.insert(val, front=front)
+        if self.stats is not None:
+            self.stats.enqueued(front, 1, self.CDLL.size)
+        return node
+
+    def dequeue(self, front: bool = True) -> T:
+        """
+        Removes a value from the deque, returning it
+        Must use the remove function of the CDLL class
+        param front: bool = True: whether to remove from the front or the back of the deque
+        Time complexity: O(1), Space complexity: O(1)
+        return: The dequeued element, None if empty
+        """
+        if self.stats is not None and self.CDLL.size:
+            self.stats.dequeued(front, 1)
+        return self.CDLL.remove(front=front)
+
+    def _nodes(self) -> CDLL:
+        """
+        Returns the node backend, raises TypeError on the block backend, whose values have no nodes of their own
+        """
+        if not isinstance(self.CDLL, CDLL):
+            raise TypeError("node handles need the node backend, not block_size")
+        return self.CDLL
+
+    def remove_node(self, node: CDLLNode) -> T:
+        """
+        Removes the value behind a handle returned by enqueue or insert_after, see CDLL.remove_node
+        param node: CDLLNode: handle of a node in this CDLLCD
+        Time complexity: O(1), Space complexity: O(1)
+        return: the removed value
+        """
+        return self._nodes().remove_node(node)
+
+    def insert_after(self, node: CDLLNode, val: T) -> CDLLNode:
+        """
+        Inserts a value right after the value behind a handle, see CDLL.insert_after
+        param node: CDLLNode: handle of a node in this CDLLCD
+        param val: T: the value to insert
+        Time complexity: O(1), Space complexity: O(1)
+        return: the new value's handle
+        """
+        return self._nodes().insert_after(node, val)
+
+    def move_to_front(self, node: CDLLNode) -> None:
+        """
+        Moves the value behind a handle to the front, see CDLL.move_to_front
+        param node: CDLLNode: handle of a node in this CDLLCD
+        Time complexity: O(1), Space complexity: O(1)
+        return: None
+        """
+        self._nodes().move_to_front(node)
+
+
+# an AdaptiveDeque never leaves the array backend while it holds fewer elements than this
+ADAPT_MIN_SIZE = 1024
+
+
+class _AdaptiveArray(CircularDeque):
+    """
+    CircularDeque backend of an AdaptiveDeque, reporting every resize to its owner
+    """
+
+    __slots__ = ['owner']
+
+    def __init__(self, owner: 'AdaptiveDeque', policy: ResizePolicy) -> None:
+        """
+        Creates an empty backend for `owner`
+        :return: None
+        """
+        super().__init__(policy=policy)
+        self.owner: AdaptiveDeque = owner
+
+    def _resize(self, capacity: int) -> None:
+        """
+        Resizes like CircularDeque, then reports how many elements were copied and how long it took
+        """
+        started = perf_counter()
+        super()._resize(capacity)
+        self.owner._array_resized(self.size, perf_counter() - started)
+
+
+class _AdaptiveLinked(CDLLCD):
+    """
+    CDLLCD backend of an AdaptiveDeque. Keeps track of the capacity a CircularDeque holding the same
+    values would have, and calls its owner whenever that capacity would change or `ticks` operations have passed
+    """
+
+    def __init__(self, owner: 'AdaptiveDeque', capacity: int) -> None:
+        """
+        Creates an empty backend for `owner`, modelling an array of the given capacity
+        :return: None
+        """
+        super().__init__()
+        self.owner: AdaptiveDeque = owner
+        self.capacity: int = capacity
+        self.shrink_size: int = owner.policy.shrink_size(capacity)
+        self.ticks: int = owner.window
+
+    def enqueue(self, val: T, front: bool = True) -> None:
+        """
+        Adds a value like CDLLCD.enqueue
+        """
+        self.CDLL.insert(val, front)
+        self.ticks -= 1
+        if self.CDLL.size >= self.capacity or self.ticks <= 0:
+            self.owner._linked_tick()
+
+    def dequeue(self, front: bool = True) -> T:
+        """
+        Removes a value like CDLLCD.dequeue
+        """
+        value = self.CDLL.remove(front)
+        self.ticks -= 1
+        if self.CDLL.size <= self.shrink_size or self.ticks <= 0:
+            self.owner._linked_tick()
+        return value
+
+
+class AdaptiveDeque:
+    """
+    Deque that keeps its values in either a CircularDeque or a CDLLCD and migrates between the two,
+    in a single O(n) conversion, when its recent workload says the other backend will pay off.
+    The array backend has better locality and a lower cost per operation but copies every element when it
+    resizes; the linked backend never copies, but costs more per operation and per element and walks to index.
+
+    Decisions are made once per window: between two resizes of the array backend, or every `window`
+    operations of the linked backend, which keeps modelling the resizes an array would have done.
+    array -> linked when resizes and copying concatenations took more than switch_fraction of the wall time
+    of two windows in a row, or when one resize paused for longer than max_pause;
+    linked -> array when the modelled resizes, at the copy rate last measured, less the time spent walking
+    to indexed values, would take under half of switch_fraction
+    """
+
+    __slots__ = ['backend', 'linked', 'policy', 'switch_fraction', 'max_pause', 'window', 'switch', 'strikes',
+                 'window_start', 'window_cost', 'copy_rate', 'migrations']
+
+    def __init__(self, data: Iterable[T] = None, policy: ResizePolicy = None, switch_fraction: float = 0.3,
+                 max_pause: float = None, window: int = 4096) -> None:
+        """
+        Creates an AdaptiveDeque, starting on the array backend
+        :param data: starting data to add to the back of the deque
+        :param policy: growth/shrink rules of the array backend
+        :param switch_fraction: fraction of the time resizes may take before the linked backend is preferred
+        :param max_pause: longest acceptable single resize in seconds, None for no limit
+        :param window: operations between two decisions on the linked backend
+        :return: None
+        """
+        if not 0 < switch_fraction < 1:
+            raise ValueError("switch_fraction must be between 0 and 1")
+        self.policy: ResizePolicy = policy if policy is not None else DEFAULT_POLICY
+        self.switch_fraction: float = switch_fraction
+        self.max_pause: float = max_pause
+        self.window: int = window
+        # set by the backends' callbacks, acted on once the current operation has finished
+        self.switch: bool = False
+        self.strikes: int = 0
+        self.window_start: float = perf_counter()
+        # seconds in the current window the other backend would have saved
+        self.window_cost: float = 0
+        # seconds per element copied by the last measured resize
+        self.copy_rate: float = None
+        self.migrations: int = 0
+        self.linked: bool = False
+        self.backend: CircularDeque = _AdaptiveArray(self, self.policy)
+        if data is not None:
+            self.extend(data)
+
+    @property
+    def mode(self) -> str:
+        """
+        :return: 'array' or 'linked', the backend currently holding the values
+        """
+        return 'linked' if self.linked else 'array'
+
+    def __eq__(self, other: 'AdaptiveDeque') -> bool:
+        """
+        Compares two AdaptiveDeques by value, whatever backends they are on, checking the sizes first
+        :param other: the other AdaptiveDeque
+        :return: true if equal, else false
+        """
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the AdaptiveDeque and its backend
+        """
+        return f"AdaptiveDeque({self.mode}) {self.backend}"
+
+    __repr__ = __str__
+
+    def __getstate__(self) -> tuple:
+        """
+        Pickles the values and settings only: the backends point back at their AdaptiveDeque,
+        so they are rebuilt rather than pickled
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: the state tuple passed to __setstate__
+        """
+        return list(self), self.policy, self.switch_fraction, self.max_pause, self.window
+
+    def __setstate__(self, state: tuple) -> None:
+        """
+        Rebuilds an unpickled AdaptiveDeque from __getstate__'s tuple. It starts again on the array backend
+        with fresh measurements
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        values, policy, switch_fraction, max_pause, window = state
+        self.__init__(values, policy, switch_fraction, max_pause, window)
+
+    def __len__(self) -> int:
+        """
+        :return: the number of items in the deque
+        """
+        return len(self.backend)
+
+    def __iter__(self) -> Iterator[T]:
+        """
+        Yields the values from front to back
+        """
+        return iter(self.backend)
+
+    def __reversed__(self) -> Iterator[T]:
+        """
+        Yields the values from back to front
+        """
+        return reversed(self.backend)
+
+    def __getitem__(self, index: int) -> T:
+        """
+        Returns the element `index` places from the front, negative indices count from the back
+        Time complexity: O(1) on the array backend, O(min(i, n - i)) on the linked backend
+        Returns: the element, raises IndexError if index is out of range
+        """
+        backend = self.backend
+        if not self.linked:
+            return backend[index]
+        started = perf_counter()
+        value = backend[index]
+        self.window_cost -= perf_counter() - started
+        backend.ticks -= 1
+        if backend.ticks <= 0:
+            self._linked_tick()
+            if self.switch:
+                self._migrate()
+        return value
+
+    def is_empty(self) -> bool:
+        """
+        Returns: True if empty, False otherwise
+        """
+        return len(self.backend) == 0
+
+    def front_element(self) -> T:
+        """
+        Returns: the first element if it exists, otherwise None
+        """
+        return self.backend.front_element() if len(self.backend) else None
+
+    def back_element(self) -> T:
+        """
+        Returns: the last element if it exists, otherwise None
+        """
+        return self.backend.back_element() if len(self.backend) else None
+
+    def enqueue(self, value: T, front: bool = True) -> None:
+        """
+        Adds a value to the front or back
+        param value: T: value to add
+        param front: where to add value T
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: None
+        """
+        self.backend.enqueue(value, front)
+        if self.switch:
+            self._migrate()
+
+    def dequeue(self, front: bool = True) -> T:
+        """
+        Removes an item from the front or back
+        param front: Whether to remove the front or back item
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if empty
+        """
+        removed = self.backend.dequeue(front)
+        if self.switch:
+            self._migrate()
+        return removed
+
+    def extend(self, values: Iterable[T], front: bool = False) -> None:
+        """
+        Adds every value in `values` to the front or back, in order, as if enqueue had been called once per value
+        param values: Iterable[T]: values to add
+        param front: where to add the values
+        Time complexity: O(k) for k values, Space complexity: O(k)
+        Returns: None
+        """
+        if not self.linked:
+            self.backend.extend(values, front)
+        else:
+            for value in values:
+                self.backend.enqueue(value, front)
+        if self.switch:
+            self._migrate()
+
+    def pop_many(self, count: int, front: bool = True) -> List[T]:
+        """
+        Removes up to `count` items from the front or back, as if dequeue had been called once per item
+        param count: maximum number of items to remove
+        param front: Whether to remove the front or back items
+        Time complexity: O(k) for k items, Space complexity: O(k)
+        Returns: list of the removed items in the order they were removed
+        """
+        if not self.linked:
+            removed = self.backend.pop_many(count, front)
+        else:
+            removed = [self.backend.dequeue(front) for _ in range(min(count, len(self.backend)))]
+        if self.switch:
+            self._migrate()
+        return removed
+
+    def clear(self) -> None:
+        """
+        Empties the deque and starts again on a fresh array backend
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None
+        """
+        self.linked = False
+        self.switch = False
+        self.strikes = 0
+        self.backend = _AdaptiveArray(self, self.policy)
+        self._new_window()
+
+    def truncate_front(self, count: int) -> None:
+        """
+        Discards up to `count` items from the front
+        param count: maximum number of items to discard
+        Time complexity: O(k) on the array backend, O(min(k, n - k)) on the linked backend, Space complexity: O(1)
+        Returns: None
+        """
+        self.backend.truncate_front(count)
+        self._truncated()
+
+    def truncate_back(self, count: int) -> None:
+        """
+        Discards up to `count` items from the back
+        param count: maximum number of items to discard
+        Time complexity: O(k) on the array backend, O(min(k, n - k)) on the linked backend, Space complexity: O(1)
+        Returns: None
+        """
+        self.backend.truncate_back(count)
+        self._truncated()
+
+    def _truncated(self) -> None:
+        """
+        Lets the linked backend model the shrink an array would have done after a truncation
+        """
+        if self.linked:
+            self._linked_tick()
+        if self.switch:
+            self._migrate()
+
+    def rotate(self, steps: int = 1) -> None:
+        """
+        Rotates the deque `steps` places to the right, negative steps rotate to the left
+        Time complexity: O(min(k, n - k)), Space complexity: O(min(k, n - k))
+        Returns: None
+        """
+        self.backend.rotate(steps)
+
+    def concat(self, other: 'AdaptiveDeque') -> None:
+        """
+        Moves every value of `other` onto the back of this deque and leaves `other` empty.
+        Two linked backends splice their rings in O(1); a copying concatenation on the array
+        backend counts towards the time the linked backend would have saved
+        param other: AdaptiveDeque: the deque to take the values of
+        Time complexity: O(1) if both are linked, O(m) for m values otherwise, Space complexity: O(m)
+        Returns: None
+        """
+        if other is self:
+            raise ValueError("cannot concatenate a deque with itself")
+        if not self.linked:
+            started = perf_counter()
+            self.backend.extend(list(other))
+            self.window_cost += perf_counter() - started
+        elif other.linked:
+            self.backend.CDLL.concat(other.backend.CDLL)
+            self._linked_tick()
+        else:
+            for value in other:
+                self.backend.enqueue(value, False)
+        other.clear()
+        if self.switch:
+            self._migrate()
+
+    def split_at(self, index: int) -> 'AdaptiveDeque':
+        """
+        Cuts the deque in two: this deque keeps the first `index` values and the rest move to a new
+        AdaptiveDeque with the same settings. A linked deque splits its ring and the new deque starts linked,
+        an array deque copies the moved values out
+        param index: int: number of values to keep, from 0 to size
+        Time complexity: O(min(k, n - k)) linked, O(n - k) on the array backend, Space complexity: O(n - k)
+        Returns: a new AdaptiveDeque holding the values from `index` on, raises IndexError if index is out of range
+        """
+        backend = self.backend
+        size = len(backend)
+        if not 0 <= index <= size:
+            raise IndexError("AdaptiveDeque split index out of range")
+        rest = AdaptiveDeque(policy=self.policy, switch_fraction=self.switch_fraction, max_pause=self.max_pause,
+                             window=self.window)
+        rest.copy_rate = self.copy_rate
+        if self.linked:
+            rest.linked = True
+            rest.backend = _AdaptiveLinked(rest, backend.capacity)
+            rest.backend.CDLL = backend.CDLL.split_at(index)
+            rest._linked_tick()
+        elif index < size:
+            rest.backend.extend(backend._read((backend.front + index) % backend.capacity, size - index))
+            backend.truncate_back(size - index)
+        self._truncated()
+        return rest
+
+    def _new_window(self) -> None:
+        """
+        Starts a new decision window
+        """
+        self.window_start = perf_counter()
+        self.window_cost = 0
+
+    def _array_resized(self, copied: int, seconds: float) -> None:
+        """
+        Called by the array backend after every resize, which ends a window.
+        Asks for a migration to the linked backend if this window and the previous one spent more than
+        switch_fraction of their time copying, or if this resize alone exceeded max_pause
+        """
+        if copied:
+            self.copy_rate = seconds / copied
+        if copied >= ADAPT_MIN_SIZE:
+            elapsed = perf_counter() - self.window_start
+            if self.max_pause is not None and seconds > self.max_pause:
+                self.switch = True
+            elif self.window_cost + seconds > self.switch_fraction * elapsed:
+                self.strikes += 1
+                self.switch = self.strikes >= 2
+            else:
+                self.strikes = 0
+        self._new_window()
+
+    def _linked_tick(self) -> None:
+        """
+        Called by the linked backend when the modelled array capacity would change or a window has passed.
+        Charges the modelled resize at the last measured copy rate, and at the end of a window asks for a
+        migration to the array backend if the array would have spent under half of switch_fraction resizing
+        """
+        backend = self.backend
+        size = backend.CDLL.size
+        capacity = backend.capacity
+        if size >= capacity:
+            capacity = self.policy.grown(capacity, size)
+        while size <= self.policy.shrink_size(capacity):
+            capacity = self.policy.shrunk(capacity, size)
+        if capacity != backend.capacity:
+            self.window_cost += size * self.copy_rate
+            backend.capacity = capacity
+            backend.shrink_size = self.policy.shrink_size(capacity)
+        if backend.ticks <= 0:
+            backend.ticks = self.window
+            elapsed = perf_counter() - self.window_start
+            pause = size * self.copy_rate
+            if (self.max_pause is None or pause <= self.max_pause / 2) and \
+                    self.window_cost < self.switch_fraction / 2 * elapsed:
+                self.switch = True
+            self._new_window()
+
+    def _migrate(self) -> None:
+        """
+        Moves every value to the other backend in one O(n) pass
+        """
+        old = self.backend
+        self.switch = False
+        self.strikes = 0
+        self.migrations += 1
+        if self.linked:
+            self.linked = False
+            self.backend = _AdaptiveArray(self, self.policy)
+            self.backend.extend(list(old.CDLL))
+        else:
+            self.linked = True
+            self.backend = _AdaptiveLinked(self, old.capacity)
+            if self.copy_rate is None:
+                self.copy_rate = 0
+            insert = self.backend.CDLL.insert
+            for value in old._read(old.front, old.size) if old.size else []:
+                insert(value, False)
+        self._new_window()
+
+
+# separates positional from keyword arguments in DequeLRUCache keys
+_KWARGS_MARK = object()
+
+
+class DequeLRUCache:
+    """
+    Least recently used cache: a CDLL holds [key, value, expiry] entries from most to least recently used,
+    and a dict maps each key to its node, so a hit moves the node to the front and a full cache evicts
+    from the back, all in O(1). With a ttl, entries expire that many seconds after they are put;
+    expiry is lazy, an expired entry is only dropped when it is looked up or reaches the back.
+    An instance also works as a decorator memoizing a function, like functools.lru_cache.
+    Thread-safe: get, put, pop and clear hold the cache's lock, since even a hit reorders the CDLL
+    """
+
+    __slots__ = ['maxsize', 'ttl', 'clock', 'nodes', 'index', 'hits', 'misses', 'evictions', 'expirations',
+                 'lock']
+
+    def __init__(self, maxsize: int = 128, ttl: float = None, clock: Callable[[], float] = monotonic) -> None:
+        """
+        Creates an empty DequeLRUCache
+        :param maxsize: most entries to keep
+        :param ttl: seconds an entry lives after it is put, None for no expiry
+        :param clock: where the current time comes from
+        :return: None
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.clock: Callable[[], float] = clock
+        # one pooled node is enough for an eviction to hand its node straight to the insert that follows
+        self.nodes: CDLL = CDLL(pool_size=1)
+        self.index: dict = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+        self.lock: Lock = Lock()
+
+    def __getstate__(self) -> tuple:
+        """
+        Pickles the entries, most recently used first, with the settings and counters.
+        The node index and the lock are rebuilt rather than pickled
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: the state tuple passed to __setstate__
+        """
+        with self.lock:
+            return (self.maxsize, self.ttl, self.clock, list(self.nodes),
+                    (self.hits, self.misses, self.evictions, self.expirations))
+
+    def __setstate__(self, state: tuple) -> None:
+        """
+        Rebuilds an unpickled DequeLRUCache from __getstate__'s tuple
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: None
+        """
+        maxsize, ttl, clock, entries, counters = state
+        self.__init__(maxsize, ttl, clock)
+        for entry in entries:
+            self.index[entry[0]] = self.nodes.insert(entry, front=False)
+        self.hits, self.misses, self.evictions, self.expirations = counters
+
+    def __len__(self) -> int:
+        """
+        :return: the number of entries, including expired ones that have not been dropped yet
+        """
+        return self.nodes.size
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the DequeLRUCache
+        """
+        return f"DequeLRUCache <{self.nodes.size}/{self.maxsize}, {self.hits} hits, {self.misses} misses>"
+
+    __repr__ = __str__
+
+    def __contains__(self, key) -> bool:
+        """
+        Checks for a live entry without counting a hit or miss or changing the recency order
+        Time complexity: O(1), Space complexity: O(1)
+        :return: True if key has an entry that has not expired
+        """
+        node = self.index.get(key)
+        return node is not None and (self.ttl is None or node.val[2] > self.clock())
+
+    def _drop(self, node: CDLLNode) -> None:
+        """
+        Removes an entry's node and its key
+        """
+        del self.index[node.val[0]]
+        self.nodes.remove_node(node)
+
+    def get(self, key, default: T = None) -> T:
+        """
+        Looks up a key, moving its entry to the front on a hit. An expired entry is dropped and counts as a miss
+        param key: the key to look up
+        param default: returned on a miss
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: the cached value, default on a miss
+        """
+        with self.lock:
+            node = self.index.get(key)
+            if node is None:
+                self.misses += 1
+                return default
+            if self.ttl is not None and node.val[2] <= self.clock():
+                self._drop(node)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.nodes.move_to_front(node)
+            return node.val[1]
+
+    def put(self, key, value: T) -> None:
+        """
+        Adds or replaces an entry at the front, restarting its ttl.
+        A full cache first evicts its least recently used entry from the back
+        param key: the key, must be hashable
+        param value: the value to cache
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None
+        """
+        expiry = None if self.ttl is None else self.clock() + self.ttl
+        with self.lock:
+            node = self.index.get(key)
+            if node is not None:
+                node.val[1] = value
+                node.val[2] = expiry
+                self.nodes.move_to_front(node)
+                return
+            if self.nodes.size >= self.maxsize:
+                evicted = self.nodes.remove(front=False)
+                del self.index[evicted[0]]
+                if self.ttl is not None and evicted[2] <= self.clock():
+                    self.expirations += 1
+                else:
+                    self.evictions += 1
+            self.index[key] = self.nodes.insert([key, value, expiry], front=True)
+
+    def pop(self, key, default: T = None) -> T:
+        """
+        Removes an entry
+        param key: the key to remove
+        param default: returned if there is no live entry for key
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: the removed value, default if there was none
+        """
+        with self.lock:
+            node = self.index.get(key)
+            if node is None:
+                return default
+            entry = node.val
+            self._drop(node)
+        if self.ttl is not None and entry[2] <= self.clock():
+            return default
+        return entry[1]
+
+    def clear(self) -> None:
+        """
+        Removes every entry, keeping the counters
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None
+        """
+        with self.lock:
+            self.nodes.clear()
+            self.index = {}
+
+    def info(self) -> dict:
+        """
+        :return: the counters and sizes as a dict
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'expirations': self.expirations, 'maxsize': self.maxsize, 'size': self.nodes.size}
+
+    def __call__(self, func: Callable) -> Callable:
+        """
+        Decorator form: memoizes func in this cache, keyed by its positional and keyword arguments,
+        which must be hashable. The wrapper exposes the cache as its `cache` attribute
+        param func: the function to memoize
+        Returns: the memoizing wrapper
+        """
+        missing = object()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args if not kwargs else args + (_KWARGS_MARK,) + tuple(kwargs.items())
+            value = self.get(key, missing)
+            if value is missing:
+                value = func(*args, **kwargs)
+                self.put(key, value)
+            return value
+
+        wrapper.cache = self
+        return wrapper
+
+
+class SlidingWindow:
+    """
+    Running aggregates (sum, mean, min, max) over the most recent values of a stream,
+    bounded by a count of values, a span of time, or both.
+    Built on CircularDeques: one holds the live values, and two monotonic deques hold the
+    positions of the candidates for the minimum and maximum, so every aggregate is O(1)
+    and every push is O(1) amortized
+    """
+
+    __slots__ = ['size', 'span', 'clock', 'values', 'times', 'mins', 'maxes', 'total', 'start']
+
+    def __init__(self, size: int = None, span: float = None, clock: Callable[[], float] = monotonic) -> None:
+        """
+        Creates an empty SlidingWindow
+        :param size: keep at most this many of the most recent values
+        :param span: keep only values whose timestamp is within span of the newest timestamp,
+            timestamps must be pushed in non-decreasing order
+        :param clock: where timestamps come from when push is not given one
+        :return: None
+        """
+        if size is None and span is None:
+            raise ValueError("a SlidingWindow needs a size, a span, or both")
+        if size is not None and size < 1:
+            raise ValueError("size must be at least 1")
+        self.size: int = size
+        self.span: float = span
+        self.clock: Callable[[], float] = clock
+        self.values: CircularDeque = CircularDeque()
+        self.times: CircularDeque = CircularDeque() if span is not None else None
+        # positions (stream sequence numbers) of increasing values / decreasing values
+        self.mins: CircularDeque = CircularDeque()
+        self.maxes: CircularDeque = CircularDeque()
+        self.total = 0
+        # sequence number of the oldest value in the window
+        self.start: int = 0
+
+    def __len__(self) -> int:
+        """
+        :return: the number of values in the window
+        """
+        return self.values.size
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the SlidingWindow
+        """
+        return f"SlidingWindow <size={self.size}, span={self.span}, len={len(self)}, sum={self.total}>"
+
+    __repr__ = __str__
+
+    @property
+    def sum(self):
+        """
+        Time complexity: O(1)
+        :return: the sum of the values in the window, 0 if empty
+        """
+        return self.total
+
+    @property
+    def mean(self) -> float:
+        """
+        Time complexity: O(1)
+        :return: the mean of the values in the window, None if empty
+        """
+        return self.total / self.values.size if self.values.size else None
+
+    @property
+    def min(self) -> T:
+        """
+        Time complexity: O(1)
+        :return: the smallest value in the window, None if empty
+        """
+        if self.mins.size == 0:
+            return None
+        return self.values[self.mins.front_element() - self.start]
+
+    @property
+    def max(self) -> T:
+        """
+        Time complexity: O(1)
+        :return: the largest value in the window, None if empty
+        """
+        if self.maxes.size == 0:
+            return None
+        return self.values[self.maxes.front_element() - self.start]
+
+    def _track(self, value: T, seq: int) -> None:
+        """
+        Adds the value at position `seq` to the monotonic deques, dropping the candidates it dominates
+        Time complexity: O(1) amortized
+        """
+        values, start = self.values, self.start
+        mins, maxes = self.mins, self.maxes
+        while mins.size and values[mins.back_element() - start] >= value:
+            mins.dequeue(False)
+        mins.enqueue(seq, False)
+        while maxes.size and values[maxes.back_element() - start] <= value:
+            maxes.dequeue(False)
+        maxes.enqueue(seq, False)
+
+    def _drop(self, count: int) -> None:
+        """
+        Removes the `count` oldest values from the window
+        Time complexity: O(count)
+        """
+        if count <= 0:
+            return
+        self.total -= sum(self.values.pop_many(count))
+        if self.times is not None:
+            self.times.pop_many(count)
+        self.start += count
+        while self.mins.size and self.mins.front_element() < self.start:
+            self.mins.dequeue()
+        while self.maxes.size and self.maxes.front_element() < self.start:
+            self.maxes.dequeue()
+
+    def _expired(self, now: float) -> int:
+        """
+        Counts the oldest values whose timestamps have fallen out of the span as of `now`
+        Time complexity: O(expired values)
+        """
+        if self.times is None:
+            return 0
+        count, cutoff = 0, now - self.span
+        for timestamp in self.times:
+            if timestamp > cutoff:
+                break
+            count += 1
+        return count
+
+    def push(self, value: T, timestamp: float = None) -> None:
+        """
+        Adds a value to the window, evicting whatever it pushes out
+        param value: the new value
+        param timestamp: when the value was seen, defaults to clock() for time-based windows
+        Time complexity: O(1) amortized, Space complexity: O(1) amortized
+        Returns: None
+        """
+        seq = self.start + self.values.size
+        # append before tracking, so the monotonic deques can look the new value up like any other
+        self.values.enqueue(value, False)
+        self._track(value, seq)
+        self.total += value
+        if self.times is not None:
+            timestamp = self.clock() if timestamp is None else timestamp
+            self.times.enqueue(timestamp, False)
+            self._drop(self._expired(timestamp))
+        if self.size is not None and self.values.size > self.size:
+            self._drop(self.values.size - self.size)
+
+    def push_many(self, values: Iterable[T], timestamps: Iterable[float] = None) -> None:
+        """
+        Adds a batch of values to the window in order, evicting once at the end.
+        For count-based windows only the values that can still be in the window afterwards are tracked
+        param values: the new values, oldest first
+        param timestamps: one timestamp per value, defaults to a single clock() reading for time-based windows
+        Time complexity: O(k) amortized for k values, Space complexity: O(k)
+        Returns: None
+        """
+        values = list(values)
+        if self.times is not None:
+            timestamps = [self.clock()] * len(values) if timestamps is None else list(timestamps)
+        if self.size is not None and len(values) >= self.size:
+            # everything already in the window, and the start of the batch, is about to be evicted
+            skipped = len(values) - self.size
+            self._drop(self.values.size)
+            self.start += skipped
+            values = values[skipped:]
+            if timestamps is not None:
+                timestamps = timestamps[skipped:]
+        if not values:
+            return
+
+        seq = self.start + self.values.size
+        self.values.extend(values)
+        for offset, value in enumerate(values):
+            self._track(value, seq + offset)
+        self.total += sum(values)
+        if self.times is not None:
+            self.times.extend(timestamps)
+            self._drop(self._expired(timestamps[-1]))
+        if self.size is not None and self.values.size > self.size:
+            self._drop(self.values.size - self.size)
+
+    def expire(self, now: float = None) -> None:
+        """
+        Evicts the values of a time-based window that have fallen out of its span, without pushing
+        param now: the current time, defaults to clock()
+        Time complexity: O(expired values)
+        Returns: None
+        """
+        self._drop(self._expired(self.clock() if now is None else now))
+
+
+class MultiLaneDeque:
+    """
+    A set of CircularDeque lanes, one per traffic class, with a bitmap of the non-empty lanes,
+    so the next lane to serve is found with a few integer bit operations instead of a scan.
+    Lane 0 has the highest priority. Values are enqueued at the back of a lane and dequeued from
+    its front by default, so every lane is FIFO
+    """
+
+    __slots__ = ['lanes', 'weights', 'active', 'size', 'current', 'credit']
+
+    def __init__(self, lanes: int, weights: List[int] = None, policy: ResizePolicy = None) -> None:
+        """
+        Creates a MultiLaneDeque with empty lanes
+        :param lanes: number of lanes
+        :param weights: how many items weighted round-robin serves from each lane per turn, 1 each by default
+        :param policy: growth/shrink rules of every lane
+        :return: None
+        """
+        if lanes < 1:
+            raise ValueError("a MultiLaneDeque needs at least one lane")
+        weights = [1] * lanes if weights is None else list(weights)
+        if len(weights) != lanes or min(weights) < 1:
+            raise ValueError("weights needs one weight of at least 1 per lane")
+        self.lanes: List[CircularDeque] = [CircularDeque(policy=policy) for _ in range(lanes)]
+        self.weights: List[int] = weights
+        # bit i is set while lane i is non-empty
+        self.active: int = 0
+        self.size: int = 0
+        # weighted round-robin position: the lane being served and how many more items it may give
+        self.current: int = 0
+        self.credit: int = weights[0]
+
+    def __len__(self) -> int:
+        """
+        :return: the number of items across all lanes
+        """
+        return self.size
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the MultiLaneDeque
+        """
+        return f"MultiLaneDeque <{', '.join(str(lane.size) for lane in self.lanes)}>"
+
+    __repr__ = __str__
+
+    def is_empty(self) -> bool:
+        """
+        Returns: True if every lane is empty, False otherwise
+        """
+        return self.size == 0
+
+    def lane_length(self, lane: int) -> int:
+        """
+        :return: the number of items in `lane`
+        """
+        return self.lanes[lane].size
+
+    def enqueue(self, value: T, lane: int, front: bool = False) -> None:
+        """
+        Adds a value to one lane
+        param value: T: value to add
+        param lane: index of the lane
+        param front: whether to add it to the front of the lane instead of the back
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: None
+        """
+        self.lanes[lane].enqueue(value, front)
+        self.active |= 1 << lane
+        self.size += 1
+
+    def _take(self, lane: int, front: bool) -> T:
+        """
+        Dequeues from a non-empty lane, clearing its bit once it runs empty
+        """
+        queue = self.lanes[lane]
+        value = queue.dequeue(front)
+        if queue.size == 0:
+            self.active &= ~(1 << lane)
+        self.size -= 1
+        return value
+
+    def next_lane(self) -> int:
+        """
+        Finds the highest-priority non-empty lane
+        Time complexity: O(1) bit operations, Space complexity: O(1)
+        Returns: the lane index, -1 if every lane is empty
+        """
+        active = self.active
+        return (active & -active).bit_length() - 1
+
+    def dequeue(self, front: bool = True) -> T:
+        """
+        Strict priority: removes an item from the highest-priority non-empty lane
+        param front: Whether to remove from the front or back of that lane
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if every lane is empty
+        """
+        if self.active == 0:
+            return None
+        return self._take(self.next_lane(), front)
+
+    def dequeue_weighted(self, front: bool = True) -> T:
+        """
+        Weighted round-robin: serves up to weights[lane] items from a lane before moving on to the
+        next non-empty lane, wrapping from the last lane back to the first. Empty lanes are skipped
+        through the bitmap without being visited
+        param front: Whether to remove from the front or back of the lane
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if every lane is empty
+        """
+        active = self.active
+        if active == 0:
+            return None
+        if self.credit == 0 or not active >> self.current & 1:
+            # lowest non-empty lane after the current one, or the lowest overall if there is none
+            after = active >> (self.current + 1) << (self.current + 1)
+            lanes = after if after else active
+            self.current = (lanes & -lanes).bit_length() - 1
+            self.credit = self.weights[self.current]
+        self.credit -= 1
+        return self._take(self.current, front)
+
+    def dequeue_batch(self, max_items: int, weighted: bool = False, front: bool = True) -> List[T]:
+        """
+        Removes up to `max_items` items across lanes in the order dequeue (or dequeue_weighted) would.
+        Strict priority drains each lane with a single pop_many
+        param max_items: largest number of items to remove
+        param weighted: use weighted round-robin instead of strict priority
+        param front: Whether to remove from the front or back of the lanes
+        Time complexity: O(k) for k items, Space complexity: O(k)
+        Returns: list of the removed items
+        """
+        removed: List[T] = []
+        if weighted:
+            while len(removed) < max_items and self.active:
+                removed.append(self.dequeue_weighted(front))
+            return removed
+        while len(removed) < max_items and self.active:
+            lane = self.next_lane()
+            queue = self.lanes[lane]
+            taken = queue.pop_many(max_items - len(removed), front)
+            if queue.size == 0:
+                self.active &= ~(1 << lane)
+            self.size -= len(taken)
+            removed.extend(taken)
+        return removed
+
+
+class UndoHistory:
+    """
+    Undo/redo history of a state changed by deltas, kept as a paired undo and redo stack of CircularDeques.
+    The state before the oldest undoable delta is kept as `base`; evicting the oldest entry folds its
+    delta into base, so history can be capped by entry count and by approximate byte size.
+    With snapshot_every=k, every k-th entry also stores the state it produced, so undoing replays at
+    most k deltas instead of the whole history.
+    `apply(state, delta)` must return the new state without modifying `state`, since earlier states
+    are kept as base and snapshots
+    """
+
+    __slots__ = ['apply', 'state', 'base', 'undos', 'redos', 'max_bytes', 'nbytes', 'snapshot_every',
+                 'since_snapshot', 'sizeof']
+
+    def __init__(self, initial: T, apply: Callable[[T, T], T], max_entries: int = None, max_bytes: int = None,
+                 snapshot_every: int = None, sizeof: Callable[[T], int] = getsizeof) -> None:
+        """
+        Creates an empty history starting at `initial`
+        :param initial: the starting state
+        :param apply: returns the state produced by applying a delta to a state
+        :param max_entries: most undoable entries to keep, None for no limit
+        :param max_bytes: most approximate bytes of deltas and snapshots to keep, None for no limit
+        :param snapshot_every: store a snapshot of the state every this many entries, None for no snapshots
+        :param sizeof: approximate size in bytes of a delta or snapshot, sys.getsizeof by default
+        :return: None
+        """
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if snapshot_every is not None and snapshot_every < 1:
+            raise ValueError("snapshot_every must be at least 1")
+        self.apply: Callable[[T, T], T] = apply
+        self.state: T = initial
+        self.base: T = initial
+        # (delta, snapshot or None, bytes) entries, oldest at the front; a full bounded deque folds its oldest
+        self.undos: CircularDeque = CircularDeque(maxlen=max_entries, on_evict=self._fold)
+        # undone deltas, most recently undone at the back
+        self.redos: CircularDeque = CircularDeque()
+        self.max_bytes: int = max_bytes
+        self.nbytes: int = 0
+        self.snapshot_every: int = snapshot_every
+        # entries on top of the undo stack since the last snapshot (or base)
+        self.since_snapshot: int = 0
+        self.sizeof: Callable[[T], int] = sizeof
+
+    def __len__(self) -> int:
+        """
+        :return: the number of actions that can be undone
+        """
+        return self.undos.size
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the UndoHistory
+        """
+        return f"UndoHistory <{self.undos.size} undo, {self.redos.size} redo, {self.nbytes} bytes>"
+
+    __repr__ = __str__
+
+    def can_undo(self) -> bool:
+        """
+        Returns: True if there is an action to undo, False otherwise
+        """
+        return self.undos.size > 0
+
+    def can_redo(self) -> bool:
+        """
+        Returns: True if there is an undone action to redo, False otherwise
+        """
+        return self.redos.size > 0
+
+    def _push(self, delta: T) -> None:
+        """
+        Records a delta already applied to state, snapshotting every snapshot_every entries,
+        then evicts the oldest entries while the byte cap is exceeded
+        """
+        self.since_snapshot += 1
+        snapshot = None
+        nbytes = self.sizeof(delta)
+        if self.snapshot_every is not None and self.since_snapshot >= self.snapshot_every:
+            snapshot = self.state
+            nbytes += self.sizeof(snapshot)
+            self.since_snapshot = 0
+        self.undos.enqueue((delta, snapshot, nbytes), False)
+        self.nbytes += nbytes
+        if self.max_bytes is not None:
+            while self.nbytes > self.max_bytes and self.undos.size:
+                self._fold(self.undos.dequeue())
+
+    def _fold(self, entry: tuple) -> None:
+        """
+        Folds an entry evicted from the front of the undo stack into base
+        """
+        delta, snapshot, nbytes = entry
+        self.base = snapshot if snapshot is not None else self.apply(self.base, delta)
+        self.nbytes -= nbytes
+        self.since_snapshot = min(self.since_snapshot, self.undos.size)
+
+    def do(self, delta: T) -> T:
+        """
+        Applies a new action, which invalidates every undone action
+        param delta: the change to apply
+        Time complexity: O(1)* plus one apply, Space complexity: O(1)*
+        Returns: the new state
+        """
+        self.state = self.apply(self.state, delta)
+        if self.redos.size:
+            self.redos.clear()
+        self._push(delta)
+        return self.state
+
+    def undo(self) -> bool:
+        """
+        Steps back one action by replaying the deltas after the latest snapshot (or base),
+        at most snapshot_every applies when snapshots are on
+        Time complexity: O(k) applies for k entries since the latest snapshot, Space complexity: O(1)*
+        Returns: True if an action was undone, False if there was nothing to undo
+        """
+        if self.undos.size == 0:
+            return False
+        delta, _, nbytes = self.undos.dequeue(False)
+        self.nbytes -= nbytes
+        self.redos.enqueue(delta, False)
+
+        index = self.undos.size - 1
+        while index >= 0 and self.undos[index][1] is None:
+            index -= 1
+        state = self.base if index < 0 else self.undos[index][1]
+        for replayed in range(index + 1, self.undos.size):
+            state = self.apply(state, self.undos[replayed][0])
+        self.state = state
+        self.since_snapshot = self.undos.size - 1 - index
+        return True
+
+    def redo(self) -> bool:
+        """
+        Re-applies the most recently undone action
+        Time complexity: O(1)* plus one apply, Space complexity: O(1)*
+        Returns: True if an action was redone, False if there was nothing to redo
+        """
+        if self.redos.size == 0:
+            return False
+        delta = self.redos.dequeue(False)
+        self.state = self.apply(self.state, delta)
+        self._push(delta)
+        return True
+
+
+class ConcurrentCircularDeque:
+    """
+    Thread-safe CircularDeque: every operation holds one lock, and blocking put/get
+    wait on condition variables instead of polling.
+    put adds to the back and get takes from the front, so put/get behave like a FIFO queue,
+    while enqueue/dequeue keep the non-blocking CircularDeque semantics
+    """
+
+    __slots__ = ['deque', 'maxsize', 'lock', 'not_empty', 'not_full']
+
+    def __init__(self, maxsize: int = 0, policy: ResizePolicy = None) -> None:
+        """
+        Creates an empty ConcurrentCircularDeque
+        :param maxsize: put blocks while the deque holds this many items, 0 for no limit
+        :param policy: growth/shrink rules of the underlying CircularDeque
+        :return: None
+        """
+        self.deque: CircularDeque = CircularDeque(policy=policy)
+        self.maxsize: int = maxsize
+        self.lock: Lock = Lock()
+        self.not_empty: Condition = Condition(self.lock)
+        self.not_full: Condition = Condition(self.lock)
+
+    def __len__(self) -> int:
+        """
+        :return: the number of items in the deque at the time of the call
+        """
+        return self.deque.size
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the ConcurrentCircularDeque
+        """
+        with self.lock:
+            return "Concurrent" + str(self.deque)
+
+    __repr__ = __str__
+
+    def is_empty(self) -> bool:
+        """
+        Returns: True if the deque was empty at the time of the call, False otherwise
+        """
+        return self.deque.size == 0
+
+    def front_element(self) -> T:
+        """
+        Returns: the first element if it exists, otherwise None
+        """
+        with self.lock:
+            return self.deque.front_element() if self.deque.size else None
+
+    def back_element(self) -> T:
+        """
+        Returns: the last element if it exists, otherwise None
+        """
+        with self.lock:
+            return self.deque.back_element() if self.deque.size else None
+
+    def enqueue(self, value: T, front: bool = True) -> None:
+        """
+        Adds a value to the front or back without waiting, ignoring maxsize like CircularDeque.enqueue would
+        param value: T: value to add
+        param front: where to add value T
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: None
+        """
+        with self.lock:
+            self.deque.enqueue(value, front)
+            self.not_empty.notify()
+
+    def dequeue(self, front: bool = True) -> T:
+        """
+        Removes an item from the front or back without waiting
+        param front: Whether to remove the front or back item
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if empty
+        """
+        with self.lock:
+            if self.deque.size == 0:
+                return None
+            removed = self.deque.dequeue(front)
+            self.not_full.notify()
+            return removed
+
+    def put(self, value: T, front: bool = False, block: bool = True, timeout: float = None) -> None:
+        """
+        Adds a value, waiting for room if the deque holds maxsize items
+        param value: T: value to add
+        param front: where to add value T, the back by default
+        param block: whether to wait for room at all
+        param timeout: longest time to wait in seconds, None to wait indefinitely
+        Returns: None, raises queue.Full if there is still no room
+        """
+        with self.not_full:
+            if self.maxsize > 0:
+                deadline = None if timeout is None else monotonic() + timeout
+                while self.deque.size >= self.maxsize:
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if not block or (remaining is not None and remaining <= 0):
+                        raise Full
+                    self.not_full.wait(remaining)
+            self.deque.enqueue(value, front)
+            self.not_empty.notify()
+
+    def get(self, front: bool = True, block: bool = True, timeout: float = None) -> T:
+        """
+        Removes an item, waiting for one if the deque is empty
+        param front: Whether to remove the front or back item, the front by default
+        param block: whether to wait for an item at all
+        param timeout: longest time to wait in seconds, None to wait indefinitely
+        Returns: the removed item, raises queue.Empty if there is still none
+        """
+        with self.not_empty:
+            deadline = None if timeout is None else monotonic() + timeout
+            while self.deque.size == 0:
+                remaining = None if deadline is None else deadline - monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise Empty
+                self.not_empty.wait(remaining)
+            removed = self.deque.dequeue(front)
+            self.not_full.notify()
+            return removed
+
+
+class SPSCRing:
+    """
+    Fixed-capacity ring buffer for exactly one producer thread and one consumer thread.
+    The producer only ever advances `tail` and the consumer only ever advances `head`, so neither
+    side takes a lock: a slot is filled before tail moves past it and emptied before head moves past it.
+    Relies on the GIL making each attribute store visible atomically and in order
+    """
+
+    __slots__ = ['capacity', 'mask', 'buffer', 'head', 'tail']
+
+    def __init__(self, capacity: int = 1024) -> None:
+        """
+        Creates an empty SPSCRing
+        :param capacity: number of slots, rounded up to a power of two
+        :return: None
+        """
+        self.capacity: int = _power_of_two(max(capacity, 2))
+        self.mask: int = self.capacity - 1
+        self.buffer: List[T] = [None] * self.capacity
+        # monotonically increasing counts of items read and written
+        self.head: int = 0
+        self.tail: int = 0
+
+    def __len__(self) -> int:
+        """
+        :return: the number of items in the ring at the time of the call
+        """
+        return self.tail - self.head
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the SPSCRing
+        """
+        return f"SPSCRing <{len(self)}/{self.capacity}>"
+
+    __repr__ = __str__
+
+    def is_empty(self) -> bool:
+        """
+        Returns: True if the ring was empty at the time of the call, False otherwise
+        """
+        return self.tail == self.head
+
+    def put_nowait(self, value: T) -> None:
+        """
+        Adds a value at the back. Producer thread only
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None, raises queue.Full if the ring is full
+        """
+        tail = self.tail
+        if tail - self.head == self.capacity:
+            raise Full
+        self.buffer[tail & self.mask] = value
+        self.tail = tail + 1
+
+    def get_nowait(self) -> T:
+        """
+        Removes the value at the front. Consumer thread only
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: the value, raises queue.Empty if the ring is empty
+        """
+        head = self.head
+        if head == self.tail:
+            raise Empty
+        index = head & self.mask
+        value = self.buffer[index]
+        self.buffer[index] = None
+        self.head = head + 1
+        return value
+
+    def put(self, value: T, timeout: float = None) -> None:
+        """
+        Adds a value at the back, backing off while the ring is full. Producer thread only
+        param timeout: longest time to wait in seconds, None to wait indefinitely
+        Returns: None, raises queue.Full if there is still no room
+        """
+        delay, deadline = 0.0, None if timeout is None else monotonic() + timeout
+        while self.tail - self.head == self.capacity:
+            if deadline is not None and monotonic() >= deadline:
+                raise Full
+            sleep(delay)
+            delay = min(2 * delay or 1e-6, 1e-3)
+        self.put_nowait(value)
+
+    def get(self, timeout: float = None) -> T:
+        """
+        Removes the value at the front, backing off while the ring is empty. Consumer thread only
+        param timeout: longest time to wait in seconds, None to wait indefinitely
+        Returns: the value, raises queue.Empty if there is still none
+        """
+        delay, deadline = 0.0, None if timeout is None else monotonic() + timeout
+        while self.head == self.tail:
+            if deadline is not None and monotonic() >= deadline:
+                raise Empty
+            sleep(delay)
+            delay = min(2 * delay or 1e-6, 1e-3)
+        return self.get_nowait()
+
+
+class WorkStealingDeque(CircularDeque):
+    """
+    CircularDeque shared between one owner thread and any number of thieves.
+    The owner pushes and pops at the back, so it works on its most recent (cache-warm) tasks,
+    while thieves steal from the front, taking the oldest tasks, which tend to be the largest.
+    Every operation holds the deque's own lock, so contention is per deque rather than on a central queue
+    """
+
+    __slots__ = ['lock']
+
+    def __init__(self, policy: ResizePolicy = None, stats: DequeStats = None) -> None:
+        """
+        Creates an empty WorkStealingDeque
+        :param policy: growth/shrink rules of the deque
+        :param stats: counters to record operations and resizes in, None to skip instrumentation
+        :return: None
+        """
+        super().__init__(policy=policy, stats=stats)
+        self.lock: Lock = Lock()
+
+    def __getstate__(self) -> tuple:
+        """
+        Pickles a consistent snapshot of the live elements; the lock itself is not pickled
+        Time complexity: O(n), Space complexity: O(n)
+        Returns: the state tuple passed to __setstate__
+        """
+        with self.lock:
+            return super().__getstate__()
+
+    def __setstate__(self, state: tuple) -> None:
+        """
+        Rebuilds an unpickled deque with a fresh lock
+        Time complexity: O(capacity), Space complexity: O(capacity)
+        Returns: None
+        """
+        super().__setstate__(state)
+        self.lock = Lock()
+
+    def push(self, value: T) -> None:
+        """
+        Adds a value at the back. Owner side
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: None
+        """
+        with self.lock:
+            self.enqueue(value, False)
+
+    def push_many(self, values: Iterable[T]) -> None:
+        """
+        Adds every value in `values` at the back, in order. Owner side
+        Time complexity: O(k) for k values, Space complexity: O(k)
+        Returns: None
+        """
+        with self.lock:
+            self.extend(values)
+
+    def pop(self) -> T:
+        """
+        Removes the most recently pushed value from the back. Owner side
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if empty
+        """
+        with self.lock:
+            return self.dequeue(False) if self.size else None
+
+    def steal(self) -> T:
+        """
+        Removes the oldest value from the front. Thief side
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if empty
+        """
+        with self.lock:
+            return self.dequeue(True) if self.size else None
+
+    def steal_half(self) -> List[T]:
+        """
+        Removes the older half of the values (rounded up) from the front in one locked step,
+        so a thief that finds a busy victim does not have to come back for every task. Thief side
+        Time complexity: O(k) for k values stolen, Space complexity: O(k)
+        Returns: list of the removed items, oldest first, empty if the deque is empty
+        """
+        with self.lock:
+            return self.pop_many((self.size + 1) // 2, True)
+
+
+class AsyncCircularDeque:
+    """
+    CircularDeque for asyncio code: dequeue suspends until an item is available and enqueue
+    suspends while the deque is at its high-water mark, so producers and consumers never poll.
+    Waiting coroutines are kept in CircularDeques of futures and woken in arrival order.
+    Not thread-safe: use it from a single event loop
+    """
+
+    __slots__ = ['deque', 'high_water', 'getters', 'putters']
+
+    def __init__(self, high_water: int = 0, policy: ResizePolicy = None) -> None:
+        """
+        Creates an empty AsyncCircularDeque
+        :param high_water: enqueue waits while the deque holds this many items, 0 for no limit
+        :param policy: growth/shrink rules of the underlying CircularDeque
+        :return: None
+        """
+        self.deque: CircularDeque = CircularDeque(policy=policy)
+        self.high_water: int = high_water
+        self.getters: CircularDeque = CircularDeque()
+        self.putters: CircularDeque = CircularDeque()
+
+    def __len__(self) -> int:
+        """
+        :return: the number of items in the deque
+        """
+        return self.deque.size
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the AsyncCircularDeque
+        """
+        return "Async" + str(self.deque)
+
+    __repr__ = __str__
+
+    def is_empty(self) -> bool:
+        """
+        Returns: True if empty, False otherwise
+        """
+        return self.deque.size == 0
+
+    def is_full(self) -> bool:
+        """
+        Returns: True if the deque is at or above its high-water mark, False otherwise
+        """
+        return 0 < self.high_water <= self.deque.size
+
+    def front_element(self) -> T:
+        """
+        Returns: the first element if it exists, otherwise None
+        """
+        return self.deque.front_element() if self.deque.size else None
+
+    def back_element(self) -> T:
+        """
+        Returns: the last element if it exists, otherwise None
+        """
+        return self.deque.back_element() if self.deque.size else None
+
+    @staticmethod
+    def _wake(waiters: CircularDeque) -> bool:
+        """
+        Wakes the longest-waiting coroutine in `waiters` that is still waiting
+        Returns: True if one was woken, False if none was waiting
+        """
+        while waiters.size:
+            future = waiters.dequeue()
+            if not future.done():
+                future.set_result(None)
+                return True
+        return False
+
+    async def _wait(self, waiters: CircularDeque, timeout: float = None) -> None:
+        """
+        Suspends until woken through `waiters`, raises asyncio.TimeoutError after `timeout` seconds
+        """
+        # asyncio is imported on first use so that importing the module stays cheap
+        from asyncio import Future, get_running_loop, wait_for
+        future: Future = get_running_loop().create_future()
+        waiters.enqueue(future, False)
+        try:
+            if timeout is None:
+                await future
+            else:
+                await wait_for(future, timeout)
+        except BaseException:
+            future.cancel()
+            if future.done() and not future.cancelled():
+                # woken just as we were cancelled: hand the wakeup on rather than losing it
+                self._wake(waiters)
+            raise
+
+    def enqueue_nowait(self, value: T, front: bool = True) -> None:
+        """
+        Adds a value to the front or back without waiting, even past the high-water mark
+        param value: T: value to add
+        param front: where to add value T
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: None
+        """
+        self.deque.enqueue(value, front)
+        self._wake(self.getters)
+
+    def dequeue_nowait(self, front: bool = True) -> T:
+        """
+        Removes an item from the front or back without waiting
+        param front: Whether to remove the front or back item
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: removed item, None if empty
+        """
+        if self.deque.size == 0:
+            return None
+        removed = self.deque.dequeue(front)
+        self._wake(self.putters)
+        return removed
+
+    async def enqueue(self, value: T, front: bool = True) -> None:
+        """
+        Adds a value to the front or back, first waiting while the deque is at its high-water mark
+        param value: T: value to add
+        param front: where to add value T
+        Returns: None
+        """
+        while self.is_full():
+            await self._wait(self.putters)
+        self.enqueue_nowait(value, front)
+
+    async def dequeue(self, front: bool = True) -> T:
+        """
+        Removes an item from the front or back, waiting until there is one
+        param front: Whether to remove the front or back item
+        Returns: the removed item
+        """
+        while self.deque.size == 0:
+            await self._wait(self.getters)
+        return self.dequeue_nowait(front)
+
+    async def dequeue_batch(self, max_items: int, timeout: float = None, front: bool = True) -> List[T]:
+        """
+        Waits until at least one item is available, then removes up to `max_items` at once,
+        so a consumer drains many items per event-loop wakeup
+        param max_items: largest number of items to remove
+        param timeout: longest time to wait for the first item in seconds, None to wait indefinitely
+        param front: Whether to remove the front or back items
+        Returns: list of the removed items in the order they were removed, empty if the timeout expired
+        """
+        from asyncio import get_running_loop, TimeoutError as AsyncTimeoutError
+        deadline = None if timeout is None else get_running_loop().time() + timeout
+        while self.deque.size == 0:
+            remaining = None if deadline is None else deadline - get_running_loop().time()
+            if remaining is not None and remaining <= 0:
+                return []
+            try:
+                await self._wait(self.getters, remaining)
+            except AsyncTimeoutError:
+                return []
+        removed = self.deque.pop_many(max_items, front)
+        for _ in removed:
+            if not self._wake(self.putters):
+                break
+        return removed
+
+
+# header of a ring stored in a raw buffer: magic, record format, capacity, record size, front, size
+_RING_HEADER = Struct('<8s24sQQQQ')
+_RING_MAGIC = b'CDEQUE01'
+# offset of the (front, size) counters inside the header
+_RING_COUNTERS = Struct('<QQ')
+_RING_COUNTERS_OFFSET = _RING_HEADER.size - _RING_COUNTERS.size
+# offset of the capacity inside the header
+_RING_CAPACITY = Struct('<Q')
+_RING_CAPACITY_OFFSET = 32
+
+
+class _BufferCircularDeque:
+    """
+    Circular Deque of fixed-size struct records kept in a raw writable buffer, after a small header
+    that holds the record format, the capacity and the front/size counters.
+    Everything the deque knows lives in the buffer itself, so any number of handles on the same
+    memory see one deque: every locked operation starts with _sync, which lets a handle whose buffer
+    can grow pick up a capacity changed through another handle. The back index is derived as front + size - 1
+    """
+
+    __slots__ = ['buffer', 'record', 'single', 'capacity', 'lock']
+
+    def _bind(self, buffer: memoryview) -> None:
+        """
+        Reads the layout of the ring from the header at the start of `buffer`
+        """
+        magic, fmt, capacity, record_size, _, _ = _RING_HEADER.unpack_from(buffer)
+        if magic != _RING_MAGIC:
+            raise ValueError("buffer does not hold a circular deque")
+        self.buffer: memoryview = buffer
+        self.record: Struct = Struct(fmt.rstrip(b'\0').decode())
+        self.single: bool = len(self.record.unpack(bytes(self.record.size))) == 1
+        self.capacity: int = capacity
+        if self.record.size != record_size:
+            raise ValueError("record size in header does not match its format")
+
+    @staticmethod
+    def _format(buffer: memoryview, fmt: str, capacity: int) -> None:
+        """
+        Writes the header of an empty ring with `capacity` records of struct format `fmt` into `buffer`
+        """
+        record = Struct(fmt)
+        if len(record.format) > 24:
+            raise ValueError("record format is too long")
+        _RING_HEADER.pack_into(buffer, 0, _RING_MAGIC, record.format.encode(), capacity, record.size, 0, 0)
+
+    def _sync(self) -> None:
+        """
+        Called under the lock before every operation that indexes the ring. Fixed-size buffers never change
+        """
+
+    def _counters(self) -> Tuple[int, int]:
+        """
+        Returns: the (front, size) counters
+        """
+        return _RING_COUNTERS.unpack_from(self.buffer, _RING_COUNTERS_OFFSET)
+
+    def _offset(self, index: int) -> int:
+        """
+        Returns: byte offset of the record in slot `index`
+        """
+        return _RING_HEADER.size + index * self.record.size
+
+    def _get(self, index: int) -> T:
+        """
+        Returns: the record in slot `index`, unpacked to a value if it has a single field
+        """
+        value = self.record.unpack_from(self.buffer, self._offset(index))
+        return value[0] if self.single else value
+
+    def _put(self, index: int, value: T) -> None:
+        """
+        Packs `value` into slot `index`
+        """
+        if self.single:
+            self.record.pack_into(self.buffer, self._offset(index), value)
+        else:
+            self.record.pack_into(self.buffer, self._offset(index), *value)
+
+    def __len__(self) -> int:
+        """
+        :return: the number of records in the deque
+        """
+        return self._counters()[1]
+
+    def __str__(self) -> str:
+        """
+        :return: a string representation of the deque, front to back
+        """
+        with self.lock:
+            self._sync()
+            front, size = self._counters()
+            values = [self._get((front + i) % self.capacity) for i in range(size)]
+        return f"{type(self).__name__} <{','.join(str(value) for value in values) or 'empty'}>"
+
+    __repr__ = __str__
+
+    def is_empty(self) -> bool:
+        """
+        Returns: True if empty, False otherwise
+        """
+        return self._counters()[1] == 0
+
+    def front_element(self) -> T:
+        """
+        Returns the first element in the deque
+        Time complexity: O(1), Space Complexity: O(1)
+        Returns: the first element if it exists, otherwise None
+        """
+        with self.lock:
+            self._sync()
+            front, size = self._counters()
+            return self._get(front) if size else None
+
+    def back_element(self) -> T:
+        """
+        Returns the last element in the deque
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: the last element if it exists, otherwise None
+        """
+        with self.lock:
+            self._sync()
+            front, size = self._counters()
+            return self._get((front + size - 1) % self.capacity) if size else None
+
+    def _full(self) -> None:
+        """
+        Called by enqueue when every slot is taken. Fixed-size buffers cannot make room
+        """
+        raise Full
+
+    def enqueue(self, value: T, front: bool = True) -> None:
+        """
+        Packs a value into the front or back of the deque. The record is written before the
+        counters are updated, so no reader ever sees a half-written record
+        param value: T: value to add, a tuple for multi-field record formats
+        param front: where to add value T
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: None, raises queue.Full if there is no room
+        """
+        with self.lock:
+            self._sync()
+            start, size = self._counters()
+            if size == self.capacity:
+                self._full()
+                start, size = self._counters()
+            if front:
+                start = (start - 1) % self.capacity
+                self._put(start, value)
+            else:
+                self._put((start + size) % self.capacity, value)
+            _RING_COUNTERS.pack_into(self.buffer, _RING_COUNTERS_OFFSET, start, size + 1)
+
+    def dequeue(self, front: bool = True) -> T:
+        """
+        Unpacks and removes the record at the front or back of the deque
+        param front: Whether to remove the front or back item
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: removed item, None if empty
+        """
+        with self.lock:
+            self._sync()
+            start, size = self._counters()
+            if size == 0:
+                return None
+            if front:
+                removed = self._get(start)
+                start = (start + 1) % self.capacity
+            else:
+                removed = self._get((start + size - 1) % self.capacity)
+            _RING_COUNTERS.pack_into(self.buffer, _RING_COUNTERS_OFFSET, start, size - 1)
+            return removed
+
+    def views(self) -> Tuple[memoryview, ...]:
+        """
+        Exposes the live records without copying, as one or two memoryviews that read front to back
+        when concatenated. Views are cast to the record format when it is a single native type code,
+        and are raw bytes otherwise. They are only meaningful until the deque is next modified
+        Time complexity: O(1), Space complexity: O(1)
+        Returns: tuple of one memoryview, or two if the records wrap around the end of the buffer
+        """
+        with self.lock:
+            self._sync()
+            front, size = self._counters()
+        first = min(size, self.capacity - front)
+        runs = [(front, first)] + ([(0, size - first)] if first < size else [])
+        views = []
+        for start, count in runs:
+            view = self.buffer[self._offset(start):self._offset(start + count)]
+            fmt = self.record.format
+            if len(fmt) == 1 and fmt in array_typecodes:
+                view = view.cast(fmt)
+            views.append(view)
+        return tuple(views)
+
+
+class SharedCircularDeque(_BufferCircularDeque):
+    """
+    Fixed-capacity Circular Deque whose records and counters live in a multiprocessing.shared_memory
+    segment, so processes exchange items by packing them straight into shared memory instead of
+    pickling them through a pipe.
+    Create it in one process and attach to it by name in the others; pass every process the same
+    multiprocessing.Lock when more than one process may touch the deque at a time
+    """
+
+    __slots__ = ['memory']
+
+    def __init__(self, capacity: int = 1024, fmt: str = 'd', name: str = None, lock=None) -> None:
+        """
+        Creates a new shared memory segment holding an empty deque
+        :param capacity: number of records the deque can hold
+        :param fmt: struct format of one record, e.g. 'd' for a float or 'qd' for an (int, float) pair
+        :param name: name of the segment, generated if None
+        :param lock: lock shared by every process using the deque, e.g. a multiprocessing.Lock
+        :return: None
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        # imported on first use, multiprocessing is slow to import
+        from multiprocessing.shared_memory import SharedMemory
+        self.memory: SharedMemory = SharedMemory(name, create=True,
+                                                 size=_RING_HEADER.size + capacity * Struct(fmt).size)
+        self._format(self.memory.buf, fmt, capacity)
+        self._bind(self.memory.buf)
+        self.lock = lock if lock is not None else nullcontext()
+
+    @classmethod
+    def attach(cls, name: str, lock=None) -> 'SharedCircularDeque':
+        """
+        Opens a deque created by another process
+        :param name: name of its shared memory segment
+        :param lock: the lock the other processes use
+        :return: a handle on the same deque
+        """
+        from multiprocessing.shared_memory import SharedMemory
+        deque = cls.__new__(cls)
+        deque.memory = SharedMemory(name)
+        deque._bind(deque.memory.buf)
+        deque.lock = lock if lock is not None else nullcontext()
+        return deque
+
+    @property
+    def name(self) -> str:
+        """
+        :return: name of the shared memory segment, for attach
+        """
+        return self.memory.name
+
+    def close(self) -> None:
+        """
+        Closes this process's handle; the deque lives on for the other processes
+        Any views handed out must be released first
+        """
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """
+        Destroys the shared memory segment once every process has closed it. Call from one process only
+        """
+        self.memory.unlink()
+
+
+class MmapCircularDeque(_BufferCircularDeque):
+    """
+    Persistent Circular Deque of fixed-size struct records kept in a memory-mapped file.
+    The file starts with the same header as SharedCircularDeque (format, capacity, front, size),
+    so reopening a file reads 64 bytes rather than replaying its contents, and enqueue/dequeue
+    are plain memory writes with no per-item system calls.
+    Several handles may open the same file (sharing one lock); a handle remaps the file whenever the
+    capacity in the header no longer matches its own, so growth through any handle is seen by all.
+    Every record is written before the counters that make it visible, and growing only copies
+    into the new part of the file before publishing the new capacity, so a process that dies
+    mid-operation leaves a consistent deque behind. Call flush() to also survive an OS crash
+    """
+
+    __slots__ = ['file', 'map']
+
+    def __init__(self, filename: str, fmt: str = 'd', capacity: int = 1024, lock=None) -> None:
+        """
+        Opens the deque stored in `filename`, creating an empty one if the file does not exist or is empty
+        :param filename: path of the backing file
+        :param fmt: struct format of one record, only used when creating the file
+        :param capacity: number of records to allocate room for, only used when creating the file
+        :param lock: held around every operation, e.g. a threading.Lock if several threads share the deque
+        :return: None, raises ValueError if the file already holds something other than a circular deque
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        exists = os_path.exists(filename)
+        # an existing empty file, e.g. from tempfile.mkstemp, is formatted like a new one
+        new = not exists or os_path.getsize(filename) == 0
+        self.file = open(filename, 'r+b' if exists else 'w+b')
+        if new:
+            self.file.truncate(_RING_HEADER.size + capacity * Struct(fmt).size)
+        self.map: mmap = mmap(self.file.fileno(), 0)
+        if new:
+            self._format(self.map, fmt, capacity)
+        buffer = memoryview(self.map)
+        try:
+            if len(buffer) < _RING_HEADER.size or buffer[:len(_RING_MAGIC)] != _RING_MAGIC:
+                raise ValueError(f"{filename} does not hold a circular deque")
+            self._bind(buffer)
+            if len(buffer) < self._offset(self.capacity):
+                raise ValueError(f"{filename} is shorter than the capacity in its header")
+        except Exception:
+            # never reformat or keep open a file that is not ours
+            buffer.release()
+            self.map.close()
+            self.file.close()
+            raise
+        self.lock = lock if lock is not None else nullcontext()
+
+    def __enter__(self) -> 'MmapCircularDeque':
+        """
+        :return: the deque, closed again when the with block exits
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Closes the deque
+        """
+        self.close()
+
+    def _remap(self) -> None:
+        """
+        Maps the whole file again, after it has been extended through this or another handle
+        """
+        self.buffer.release()
+        self.map.close()
+        self.map = mmap(self.file.fileno(), 0)
+        self.buffer = memoryview(self.map)
+
+    def _sync(self) -> None:
+        """
+        Remaps the file if another handle has grown the deque since this handle last looked
+        """
+        capacity = _RING_CAPACITY.unpack_from(self.buffer, _RING_CAPACITY_OFFSET)[0]
+        if capacity != self.capacity:
+            self._remap()
+            self.capacity = capacity
+
+    def _full(self) -> None:
+        """
+        Doubles the capacity like CircularDeque.grow(): extends the file, remaps it, and moves the
+        records that wrapped around to just after the old end, so the live records are contiguous again.
+        The new capacity is written to the header last
+        """
+        front, size = self._counters()
+        capacity = 2 * self.capacity
+        self.file.truncate(self._offset(capacity))
+        self._remap()
+
+        wrapped = front + size - self.capacity
+        if wrapped > 0:
+            self.map.move(self._offset(self.capacity), self._offset(0), wrapped * self.record.size)
+        _RING_HEADER.pack_into(self.buffer, 0, _RING_MAGIC, self.record.format.encode(), capacity,
+                               self.record.size, front, size)
+        self.capacity = capacity
+
+    def flush(self) -> None:
+        """
+        Forces the mapped pages out to the file
+        """
+        self.map.flush()
+
+    def close(self) -> None:
+        """
+        Flushes and closes the file. Any views handed out must be released first
+        """
+        self.buffer.release()
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+def __getattr__(name: str):
+    """
+    Loads WorkStealingExecutor from CDLL_Executor on first access, so that `import CDLL_DataManagement`
+    does not pay for concurrent.futures while the old import path keeps working
+    """
+    if name == 'WorkStealingExecutor':
+        from CDLL_Executor import WorkStealingExecutor
+        return WorkStealingExecutor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    plt.plot(window_lengths, application_avgs_array,
-             color='blue', label='Array')
-    plt.plot(window_lengths, application_avgs_CDLL, color='red', label='CDLL')
-    plt.title("Sliding Window Application")
-    plt.legend(loc='best')
-    plt.show()
 
-# plot_speed()
+# star imports export every public name, including the lazily loaded executor
+__all__ = [name for name in globals() if not name.startswith('_')] + ['WorkStealingExecutor']
@@ -0,0 +1,136 @@
+"""
+Project 5: Deque
+Shams Alkhalidy
+
+WorkStealingExecutor lives apart from CDLL_DataManagement so that importing the deques does not pull in
+concurrent.futures; CDLL_DataManagement still re-exports it on first use
+"""
+
+from concurrent.futures import Executor, Future as TaskFuture
+from threading import Condition, Lock, Thread, local
+from typing import List, Callable
+
+from CDLL_DataManagement import WorkStealingDeque
+
+
+class WorkStealingExecutor(Executor):
+    """
+    concurrent.futures Executor with one WorkStealingDeque per worker thread instead of a central queue.
+    Tasks submitted from a worker go onto that worker's own deque, tasks submitted from elsewhere are
+    dealt out round-robin. A worker runs its own newest task first; once its deque is empty it steals
+    the older half of a sibling's deque, and only sleeps when every deque is empty
+    """
+
+    def __init__(self, max_workers: int = 4, thread_name_prefix: str = 'WorkStealingExecutor') -> None:
+        """
+        Creates the executor and starts its worker threads
+        :param max_workers: number of worker threads, and of deques
+        :param thread_name_prefix: prefix of the worker thread names
+        :return: None
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.deques: List[WorkStealingDeque] = [WorkStealingDeque() for _ in range(max_workers)]
+        # index of the deque owned by the calling thread, unset outside the workers
+        self.local: local = local()
+        self.next_worker: int = 0
+        self.shutting_down: bool = False
+        # guards shutting_down, and idle workers sleep on it
+        self.idle: Condition = Condition(Lock())
+        self.sleeping: int = 0
+        self.threads: List[Thread] = [Thread(target=self._work, args=(index,), daemon=True,
+                                             name=f"{thread_name_prefix}_{index}")
+                                      for index in range(max_workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> TaskFuture:
+        """
+        Schedules fn(*args, **kwargs) to run on a worker
+        param fn: callable to run
+        Time complexity: O(1)*, Space complexity: O(1)*
+        Returns: a concurrent.futures.Future for the result, raises RuntimeError after shutdown
+        """
+        future = TaskFuture()
+        index = getattr(self.local, 'index', None)
+        # checking for shutdown and pushing under the same lock as shutdown means a worker can never
+        # see every deque empty and exit while an accepted task is still on its way in
+        with self.idle:
+            if self.shutting_down:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if index is None:
+                index = self.next_worker
+                self.next_worker = (index + 1) % len(self.deques)
+            self.deques[index].push((future, fn, args, kwargs))
+            if self.sleeping:
+                self.idle.notify()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """
+        Stops accepting tasks; the workers exit once every deque is empty
+        param wait: whether to wait for the workers to finish
+        param cancel_futures: cancel the tasks that have not started instead of running them
+        Returns: None
+        """
+        with self.idle:
+            self.shutting_down = True
+            if cancel_futures:
+                for deque in self.deques:
+                    with deque.lock:
+                        pending = deque.pop_many(deque.size)
+                    for future, _, _, _ in pending:
+                        future.cancel()
+            self.idle.notify_all()
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def _find(self, index: int) -> tuple:
+        """
+        Pops the worker's own newest task, or steals from the siblings in turn starting after it
+        Returns: a task tuple, None if every deque is empty
+        """
+        own = self.deques[index]
+        task = own.pop()
+        if task is not None:
+            return task
+        count = len(self.deques)
+        for offset in range(1, count):
+            victim = self.deques[(index + offset) % count]
+            if victim.size:
+                stolen = victim.steal_half()
+                if stolen:
+                    if len(stolen) > 1:
+                        own.push_many(stolen[1:])
+                    return stolen[0]
+        return None
+
+    def _work(self, index: int) -> None:
+        """
+        Worker thread loop: run tasks until shutdown leaves every deque empty
+        """
+        self.local.index = index
+        while True:
+            task = self._find(index)
+            if task is None:
+                with self.idle:
+                    # registering as a sleeper before the final scan means a submit either
+                    # sees the sleeper and notifies, or pushed before the scan and is found by it
+                    self.sleeping += 1
+                    task = self._find(index)
+                    while task is None and not self.shutting_down:
+                        self.idle.wait()
+                        task = self._find(index)
+                    self.sleeping -= 1
+                if task is None:
+                    return
+            future, fn, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
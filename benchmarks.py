@@ -0,0 +1,533 @@
+"""
+Benchmarks for the deques in CDLL_DataManagement
+Replaces the old interactive `plot_speed`: runs headless, repeats every measurement,
+reports percentiles, ops/sec and peak memory, and writes JSON/CSV that can be diffed across versions.
+collections.deque is measured alongside as the baseline.
+
+    python benchmarks.py --sizes 1000 10000 --trials 7 --json results.json
+"""
+
+import argparse
+import csv
+import gc
+import json
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from queue import Queue
+from random import Random
+from threading import Event, Lock, Thread
+from timeit import default_timer
+from typing import Callable, Dict, List
+
+from CDLL_DataManagement import CircularDeque, MaskedCircularDeque, CDLLCD, ConcurrentCircularDeque, SPSCRing, \
+    DequeLRUCache, AdaptiveDeque
+from CDLL_Executor import WorkStealingExecutor
+
+
+class DequeBaseline:
+    """
+    collections.deque behind the enqueue/dequeue interface of the deques being measured
+    """
+
+    __slots__ = ['deque']
+
+    def __init__(self) -> None:
+        """
+        Creates an empty baseline deque
+        :return: None
+        """
+        self.deque: deque = deque()
+
+    def __len__(self) -> int:
+        """
+        :return: the number of items in the deque
+        """
+        return len(self.deque)
+
+    def enqueue(self, value, front: bool = True) -> None:
+        """
+        Adds a value to the front or back
+        """
+        if front:
+            self.deque.appendleft(value)
+        else:
+            self.deque.append(value)
+
+    def dequeue(self, front: bool = True):
+        """
+        Removes an item from the front or back
+        :return: the removed item, None if empty
+        """
+        if not self.deque:
+            return None
+        return self.deque.popleft() if front else self.deque.pop()
+
+    def extend(self, values, front: bool = False) -> None:
+        """
+        Adds every value to the front or back
+        """
+        if front:
+            self.deque.extendleft(values)
+        else:
+            self.deque.extend(values)
+
+    def pop_many(self, count: int, front: bool = True) -> List:
+        """
+        Removes up to `count` items from the front or back
+        :return: the removed items
+        """
+        pop = self.deque.popleft if front else self.deque.pop
+        return [pop() for _ in range(min(count, len(self.deque)))]
+
+
+STRUCTURES: Dict[str, Callable] = {
+    'CircularDeque': CircularDeque,
+    'MaskedCircularDeque': MaskedCircularDeque,
+    'CDLLCD': CDLLCD,
+    'CDLLCD-block': lambda: CDLLCD(block_size=64),
+    'AdaptiveDeque': AdaptiveDeque,
+    'collections.deque': DequeBaseline,
+}
+
+
+def grow(structure, size: int, rng: Random) -> int:
+    """
+    Enqueues `size` shuffled items, alternating ends by parity
+    :return: number of operations performed
+    """
+    data = list(range(size))
+    rng.shuffle(data)
+    for item in data:
+        structure.enqueue(item, item % 2)
+    return size
+
+
+def grow_shrink(structure, size: int, rng: Random) -> int:
+    """
+    Enqueues `size` shuffled items, then dequeues them all
+    :return: number of operations performed
+    """
+    data = list(range(size))
+    rng.shuffle(data)
+    for item in data:
+        structure.enqueue(item, item % 2)
+    for item in data:
+        structure.dequeue(not item % 2)
+    return 2 * size
+
+
+def random_ops(structure, size: int, rng: Random) -> int:
+    """
+    Performs `size` operations, three enqueues to every dequeue on average
+    :return: number of operations performed
+    """
+    for item in range(size):
+        if rng.randint(0, 3) <= 2:
+            structure.enqueue(item, item % 2)
+        else:
+            structure.dequeue(item % 2)
+    return size
+
+
+def sliding_window(structure, size: int, rng: Random) -> int:
+    """
+    Finds the longest run of `size` random bits whose sum stays within size // 40,
+    the application from the original plot_speed
+    :return: number of operations performed
+    """
+    data = [rng.randint(0, 1) for _ in range(size)]
+    bound, ops, subarray_sum = size // 40, 0, 0
+    for value in data:
+        structure.enqueue(value)
+        subarray_sum += value
+        ops += 1
+        while subarray_sum > bound:
+            subarray_sum -= structure.dequeue(False)
+            ops += 1
+    return ops
+
+
+def batch(structure, size: int, rng: Random) -> int:
+    """
+    Pushes and drains `size` items in batches of 64, through extend/pop_many where the structure has them
+    :return: number of items moved
+    """
+    chunk = list(range(64))
+    extend = getattr(structure, 'extend', None)
+    pop_many = getattr(structure, 'pop_many', None)
+    for _ in range(size // 64):
+        if extend is not None:
+            extend(chunk)
+        else:
+            for item in chunk:
+                structure.enqueue(item, False)
+    for _ in range(size // 64):
+        if pop_many is not None:
+            pop_many(64)
+        else:
+            for _ in range(64):
+                structure.dequeue()
+    return 2 * 64 * (size // 64)
+
+
+WORKLOADS: Dict[str, Callable] = {
+    'grow': grow,
+    'grow_shrink': grow_shrink,
+    'random_ops': random_ops,
+    'sliding_window': sliding_window,
+    'batch': batch,
+}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    :param samples: sorted samples
+    :param fraction: which percentile, between 0 and 1
+    :return: the percentile, interpolated linearly between samples
+    """
+    position = (len(samples) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (position - low)
+
+
+def measure(workload: str, structure: str, size: int, trials: int = 5, warmup: int = 1, seed: int = 0) -> Dict:
+    """
+    Times one workload on one structure
+    Every trial replays the same random sequence. Peak memory comes from one extra run under
+    tracemalloc, kept separate so tracing does not distort the timings
+    :param workload: key of WORKLOADS
+    :param structure: key of STRUCTURES
+    :param size: workload size
+    :param trials: number of timed runs
+    :param warmup: number of untimed runs first
+    :param seed: seed of the random sequence
+    :return: one result row
+    """
+    run, make = WORKLOADS[workload], STRUCTURES[structure]
+    for _ in range(warmup):
+        run(make(), size, Random(seed))
+
+    times, ops = [], 0
+    for _ in range(trials):
+        gc.collect()
+        target = make()
+        start = default_timer()
+        ops = run(target, size, Random(seed))
+        times.append(default_timer() - start)
+    times.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    run(make(), size, Random(seed))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    median = percentile(times, 0.5)
+    return {
+        'workload': workload,
+        'structure': structure,
+        'size': size,
+        'trials': trials,
+        'ops': ops,
+        'min_s': times[0],
+        'median_s': median,
+        'p90_s': percentile(times, 0.9),
+        'max_s': times[-1],
+        'ops_per_sec': ops / median if median else float('inf'),
+        'peak_bytes': peak,
+    }
+
+
+def run_suite(workloads: List[str] = None, structures: List[str] = None, sizes: List[int] = None,
+              trials: int = 5, warmup: int = 1, seed: int = 0) -> List[Dict]:
+    """
+    Measures every combination of workload, structure and size
+    :return: list of result rows, see measure
+    """
+    results = []
+    for workload in workloads or list(WORKLOADS):
+        for size in sizes or [1000, 10000]:
+            for structure in structures or list(STRUCTURES):
+                results.append(measure(workload, structure, size, trials, warmup, seed))
+    return results
+
+
+def write_json(results: List[Dict], filename: str) -> None:
+    """
+    Writes result rows as a JSON list
+    """
+    with open(filename, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def write_csv(results: List[Dict], filename: str) -> None:
+    """
+    Writes result rows as CSV with a header line
+    """
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def print_table(results: List[Dict]) -> None:
+    """
+    Prints result rows as an aligned table
+    """
+    print(f"{'workload':<15}{'structure':<21}{'size':>8}{'median ms':>11}{'p90 ms':>10}{'ops/sec':>13}{'peak KiB':>10}")
+    for row in results:
+        print(f"{row['workload']:<15}{row['structure']:<21}{row['size']:>8}{row['median_s'] * 1e3:>11.3f}"
+              f"{row['p90_s'] * 1e3:>10.3f}{row['ops_per_sec']:>13.0f}{row['peak_bytes'] / 1024:>10.1f}")
+
+
+def plot(results: List[Dict]) -> None:
+    """
+    Plots median time against size, one figure per workload. Needs matplotlib, imported only here
+    """
+    from matplotlib import pyplot as plt
+
+    for workload in dict.fromkeys(row['workload'] for row in results):
+        rows = [row for row in results if row['workload'] == workload]
+        for structure in dict.fromkeys(row['structure'] for row in rows):
+            points = [(row['size'], row['median_s']) for row in rows if row['structure'] == structure]
+            plt.plot(*zip(*points), label=structure)
+        plt.title(workload)
+        plt.xlabel('size')
+        plt.ylabel('median seconds')
+        plt.legend(loc='best')
+        plt.show()
+
+
+def compare_masked_speed(size: int = 100000, trials: int = 5) -> None:
+    """
+    Micro-benchmark of the per-operation cost of CircularDeque against MaskedCircularDeque.
+    Prints the best time per operation in nanoseconds for each workload
+    :param size: number of operations per workload
+    :param trials: number of repetitions, the fastest one is reported
+    """
+
+    def push_back(deque):
+        for item in range(size):
+            deque.enqueue(item, False)
+
+    def push_front(deque):
+        for item in range(size):
+            deque.enqueue(item)
+
+    def fifo(deque):
+        for item in range(size):
+            deque.enqueue(item, False)
+        for _ in range(size):
+            deque.dequeue()
+
+    def steady(deque):
+        # stays at a constant size, so only the index arithmetic is measured
+        for item in range(64):
+            deque.enqueue(item, False)
+        for item in range(size):
+            deque.enqueue(item, False)
+            deque.dequeue()
+
+    for workload in (push_back, push_front, fifo, steady):
+        results = []
+        for structure in (CircularDeque, MaskedCircularDeque):
+            best = float('inf')
+            for trial in range(trials):
+                gc.collect()
+                deque = structure()
+                start = default_timer()
+                workload(deque)
+                best = min(best, default_timer() - start)
+            results.append(best / size * 1e9)
+        print(f"{workload.__name__:>10}: CircularDeque {results[0]:7.1f} ns/op, "
+              f"MaskedCircularDeque {results[1]:7.1f} ns/op ({1 - results[1] / results[0]:.0%} saved)")
+
+
+def compare_concurrent_speed(items: int = 100000, max_threads: int = 4) -> None:
+    """
+    Throughput benchmark of one producer thread handing `items` items to 1..max_threads consumer threads
+    through a ConcurrentCircularDeque, compared with queue.Queue; SPSCRing is measured with one consumer
+    Prints items per second for each configuration
+    :param items: number of items handed over per run
+    :param max_threads: largest number of consumer threads
+    """
+    stop = object()
+
+    def run(put, get, consumers):
+        def consume():
+            while get() is not stop:
+                pass
+
+        threads = [Thread(target=consume) for _ in range(consumers)]
+        gc.collect()
+        start = default_timer()
+        for thread in threads:
+            thread.start()
+        for item in range(items):
+            put(item)
+        for _ in range(consumers):
+            put(stop)
+        for thread in threads:
+            thread.join()
+        return items / (default_timer() - start)
+
+    for consumers in range(1, max_threads + 1):
+        deque = ConcurrentCircularDeque(maxsize=1024)
+        baseline = Queue(maxsize=1024)
+        line = (f"{consumers} consumer(s): ConcurrentCircularDeque {run(deque.put, deque.get, consumers):10.0f}/s, "
+                f"queue.Queue {run(baseline.put, baseline.get, consumers):10.0f}/s")
+        if consumers == 1:
+            ring = SPSCRing(1024)
+            line += f", SPSCRing {run(ring.put, ring.get, 1):10.0f}/s"
+        print(line)
+
+
+def compare_work_stealing_speed(tasks: int = 20000, workers: int = 4, depth: int = 14) -> None:
+    """
+    Throughput benchmark of WorkStealingExecutor against concurrent.futures.ThreadPoolExecutor
+    with the same number of workers on two fine-grained workloads:
+    flat, `tasks` tiny tasks submitted from the main thread,
+    and spawn, a binary tree of `depth` levels where every task submits its two children from inside a worker
+    Prints tasks per second for each executor
+    :param tasks: number of tasks in the flat workload
+    :param workers: number of worker threads of both executors
+    :param depth: number of levels of the spawn tree
+    """
+    def flat(executor):
+        wait([executor.submit(sum, range(32)) for _ in range(tasks)])
+        return tasks
+
+    def spawn(executor):
+        total = 2 ** depth - 1
+        done, lock, finished = Event(), Lock(), [0]
+
+        def node(level):
+            if level < depth - 1:
+                executor.submit(node, level + 1)
+                executor.submit(node, level + 1)
+            sum(range(32))
+            with lock:
+                finished[0] += 1
+                if finished[0] == total:
+                    done.set()
+
+        executor.submit(node, 0)
+        done.wait()
+        return total
+
+    for workload in (flat, spawn):
+        rates = []
+        for factory in (WorkStealingExecutor, ThreadPoolExecutor):
+            with factory(max_workers=workers) as executor:
+                gc.collect()
+                start = default_timer()
+                count = workload(executor)
+                rates.append(count / (default_timer() - start))
+        print(f"{workload.__name__:>6}: WorkStealingExecutor {rates[0]:10.0f}/s, "
+              f"ThreadPoolExecutor {rates[1]:10.0f}/s")
+
+
+def compare_lru_speed(calls: int = 200000, maxsize: int = 256, keys: int = 1024, seed: int = 0) -> None:
+    """
+    Benchmark of a function memoized with DequeLRUCache against functools.lru_cache with the same maxsize.
+    Arguments are drawn from `keys` distinct values with a skewed distribution, so the hit rate sits
+    between the extremes and both hits and evictions are exercised
+    Prints calls per second and the hit rate for each cache
+    :param calls: number of calls of the memoized function
+    :param maxsize: entries each cache may keep
+    :param keys: number of distinct arguments
+    :param seed: seed of the argument sequence
+    """
+    rng = Random(seed)
+    arguments = [int(keys * rng.random() ** 2) for _ in range(calls)]
+
+    def square(x):
+        return x * x
+
+    for name, decorate in (('DequeLRUCache', DequeLRUCache(maxsize)), ('functools.lru_cache', lru_cache(maxsize))):
+        memoized = decorate(square)
+        gc.collect()
+        start = default_timer()
+        for argument in arguments:
+            memoized(argument)
+        elapsed = default_timer() - start
+        info = memoized.cache.info() if name == 'DequeLRUCache' else memoized.cache_info()._asdict()
+        print(f"{name:>20}: {calls / elapsed:10.0f} calls/s, hit rate {info['hits'] / calls:.1%}")
+
+
+def compare_adaptive_speed(sizes: List[int] = None, trials: int = 5, seed: int = 0) -> None:
+    """
+    Runs the four scenarios of the old plot_speed (grow, grow_shrink, random_ops, sliding_window) on
+    CircularDeque, CDLLCD and AdaptiveDeque, and prints for each how AdaptiveDeque compares with the
+    faster of the two fixed backends and which backend it finished on
+    :param sizes: workload sizes
+    :param trials: number of timed runs per measurement
+    :param seed: seed of the random sequences
+    """
+    for workload in ('grow', 'grow_shrink', 'random_ops', 'sliding_window'):
+        for size in sizes or [1000, 20000]:
+            rates = {structure: measure(workload, structure, size, trials, 1, seed)['ops_per_sec']
+                     for structure in ('CircularDeque', 'CDLLCD', 'AdaptiveDeque')}
+            best = max(('CircularDeque', 'CDLLCD'), key=rates.get)
+            adaptive = AdaptiveDeque()
+            WORKLOADS[workload](adaptive, size, Random(seed))
+            print(f"{workload:<15}{size:>7}: best fixed {best:<13} {rates[best]:10.0f} ops/s, "
+                  f"AdaptiveDeque {rates['AdaptiveDeque']:10.0f} ops/s ({rates['AdaptiveDeque'] / rates[best]:.0%}), "
+                  f"ended {adaptive.mode} after {adaptive.migrations} migration(s)")
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Command line entry point, see --help
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), help='default: all')
+    parser.add_argument('--structures', nargs='+', choices=list(STRUCTURES), help='default: all')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000])
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write results to this JSON file')
+    parser.add_argument('--csv', help='write results to this CSV file')
+    parser.add_argument('--plot', action='store_true', help='plot the results with matplotlib')
+    parser.add_argument('--masked', action='store_true', help='run the MaskedCircularDeque micro-benchmark instead')
+    parser.add_argument('--concurrent', type=int, metavar='THREADS',
+                        help='run the threaded handoff benchmark with up to THREADS consumers instead')
+    parser.add_argument('--stealing', type=int, metavar='WORKERS',
+                        help='run the work-stealing executor benchmark with WORKERS threads instead')
+    parser.add_argument('--lru', action='store_true', help='run the DequeLRUCache benchmark instead')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='compare AdaptiveDeque with both fixed backends on the plot_speed scenarios instead')
+    args = parser.parse_args(argv)
+
+    if args.masked:
+        compare_masked_speed()
+        return
+    if args.concurrent:
+        compare_concurrent_speed(max_threads=args.concurrent)
+        return
+    if args.stealing:
+        compare_work_stealing_speed(workers=args.stealing)
+        return
+    if args.lru:
+        compare_lru_speed()
+        return
+    if args.adaptive:
+        compare_adaptive_speed(args.sizes, args.trials, args.seed)
+        return
+
+    results = run_suite(args.workloads, args.structures, args.sizes, args.trials, args.warmup, args.seed)
+    print_table(results)
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+    if args.plot:
+        plot(results)
+
+
+if __name__ == '__main__':
+    main()